@@ -9,6 +9,28 @@ def get_date_string():
     """
     return datetime.datetime.utcnow().isoformat()
 
+def timestamp_to_date_string(timestamp: float) -> str:
+    """
+    The same format as get_date_string, but for a given UNIX timestamp instead of the current time.
+    """
+    return datetime.datetime.utcfromtimestamp(timestamp).isoformat()
+
+def date_string_to_timestamp(date_string: str) -> float:
+    """
+    Converts a date string to a UNIX timestamp. Date strings without timezone are considered UTC, as the ones 
+    generated by get_date_string.
+
+    Raises ValueError.
+    """
+    try:
+        # much faster than dateutil, and enough for the strings of get_date_string.
+        date = datetime.datetime.fromisoformat(date_string)
+    except ValueError:
+        date = dateutil.parser.parse(date_string, fuzzy=False)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.timestamp()
+
 def check_date_string(date_string: str) -> bool:
     """
     To check the integrity of date strings, for example message ID-s.
@@ -0,0 +1,72 @@
+import socket
+import threading
+
+
+class HostIdentity:
+    """
+    The hostname and IP of this host. They are resolved when the object is created, and refreshed periodically in a
+    background thread, so getting them never waits for DNS.
+    """
+
+    def __init__(self, refresh_period: float=300) -> None:
+        self._refresh_period = refresh_period
+        self._hostname = socket.gethostname()
+        self._ip = None
+        self._stop_refresh = threading.Event()
+
+        self.refresh()
+
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name="Host identity refresh", daemon=True)
+        self._refresh_thread.start()
+
+
+    def refresh(self) -> None:
+        """
+        Resolves the hostname and IP again. The previous values are kept if the resolution fails.
+        """
+        try:
+            hostname = socket.getfqdn()
+            self._hostname = hostname
+            self._ip = socket.gethostbyname_ex(hostname)[2][0]
+        except (OSError, IndexError):
+            pass
+
+
+    def get_hostname(self) -> str:
+        return self._hostname
+
+    def get_ip(self) -> str | None:
+        """
+        Returns None if the IP have never been resolved.
+        """
+        return self._ip
+
+    def stop(self) -> None:
+        """
+        Stops the refresh thread. The last resolved values can still be got.
+        """
+        self._stop_refresh.set()
+        self._refresh_thread.join()
+
+    def is_running(self) -> bool:
+        return not self._stop_refresh.is_set()
+
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_refresh.wait(self._refresh_period):
+            self.refresh()
+
+
+_host_identity: HostIdentity | None = None
+_host_identity_lock = threading.Lock()
+
+
+def get_host_identity() -> HostIdentity:
+    """
+    Returns the host identity shared by all the objects of the program, creating it the first time, or if it have been stopped.
+    """
+    global _host_identity
+    with _host_identity_lock:
+        if _host_identity is None or not _host_identity.is_running():
+            _host_identity = HostIdentity()
+        return _host_identity
@@ -8,6 +8,7 @@ class MonitorType(str, Enum):
     """
     periodic = 'periodic'
     change = 'change'
+    aggregate = 'aggregate'
     inactive = 'inactive'
 
     def from_string(string_mode: str) -> MonitorType:
@@ -18,8 +19,10 @@ class MonitorType(str, Enum):
             return MonitorType.periodic
         elif string_mode == 'change':
             return MonitorType.change
+        elif string_mode == 'aggregate':
+            return MonitorType.aggregate
         elif string_mode == 'inactive':
             return MonitorType.inactive
         else:
-            raise ValueError("Only 'periodic', 'change' or 'inactive' are allowed for monitor type.")
+            raise ValueError("Only 'periodic', 'change', 'aggregate' or 'inactive' are allowed for monitor type.")
 
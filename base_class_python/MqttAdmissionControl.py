@@ -0,0 +1,121 @@
+import threading
+import time
+from collections.abc import Iterable
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter. It is refilled with rate tokens per second, up to burst tokens.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        Raises ValueError.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("Token bucket rate should be positive and burst at least 1.")
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._last_refill_time = time.monotonic()
+
+    def has_token(self) -> bool:
+        self._refill()
+        return self._tokens >= 1
+
+    def take_token(self) -> None:
+        self._tokens -= 1
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._last_refill_time) * self._rate)
+        self._last_refill_time = now
+
+
+class MqttAdmissionControl:
+    """
+    Decides if incoming commands are executed or rejected, to protect the server of command floods.
+    A command is only admitted if there are tokens both in the bucket of its variable and in the bucket of its
+    command type. Priority commands are always admitted, so for example MONITOR stop commands or safety PUTs don't
+    wait behind a flood of GETs.
+
+    Rates are given as (commands per second, burst size) tuples. Variables or command types without rate are not
+    limited. Priority commands are (variable name, command type) tuples, where '*' matches any of them.
+    """
+
+    def __init__(self, default_variable_rate: tuple[float, int] | None=None,
+                 variable_rates: dict[str, tuple[float, int]] | None=None,
+                 command_type_rates: dict[str, tuple[float, int]] | None=None,
+                 priority_commands: Iterable[tuple[str, str]]=(('*', 'MONITOR'),)) -> None:
+        """
+        Raises ValueError.
+        """
+        self._default_variable_rate = default_variable_rate
+        self._variable_rates = dict(variable_rates) if variable_rates is not None else {}
+        self._priority_commands = set(priority_commands)
+        self._lock = threading.Lock()
+
+        # buckets are validated now, so configuration errors appear at startup.
+        if default_variable_rate is not None:
+            TokenBucket(*default_variable_rate)
+        self._variable_buckets: dict[str, TokenBucket] = {variable_name: TokenBucket(*rate) for (variable_name, rate) in self._variable_rates.items()}
+        self._command_type_buckets: dict[str, TokenBucket] = {command_type: TokenBucket(*rate) for (command_type, rate) in (command_type_rates or {}).items()}
+
+        self._admitted = 0
+        self._admitted_with_priority = 0
+        self._rejected_by_variable: dict[str, int] = {}
+        self._rejected_by_command_type: dict[str, int] = {}
+
+
+    def admit_command(self, variable_name: str, command_type: str) -> tuple[bool, str]:
+        """
+        Returns a tuple with True if the command can be executed, or False and the reason of the rejection.
+        """
+        with self._lock:
+            if self._is_priority_command(variable_name, command_type):
+                self._admitted += 1
+                self._admitted_with_priority += 1
+                return (True, "")
+
+            variable_bucket = self._get_variable_bucket(variable_name)
+            command_type_bucket = self._command_type_buckets.get(command_type)
+
+            # tokens are only taken if both buckets have them, so a rejection doesn't consume the other limit.
+            if variable_bucket is not None and not variable_bucket.has_token():
+                self._count_rejection(variable_name, command_type)
+                return (False, "Rate limit of variable {} exceeded.".format(variable_name))
+            if command_type_bucket is not None and not command_type_bucket.has_token():
+                self._count_rejection(variable_name, command_type)
+                return (False, "Rate limit of {} commands exceeded.".format(command_type))
+
+            if variable_bucket is not None:
+                variable_bucket.take_token()
+            if command_type_bucket is not None:
+                command_type_bucket.take_token()
+            self._admitted += 1
+            return (True, "")
+
+
+    def get_statistics(self) -> dict[str, int | dict[str, int]]:
+        with self._lock:
+            return {"Admitted": self._admitted,
+                    "AdmittedWithPriority": self._admitted_with_priority,
+                    "Rejected": sum(self._rejected_by_variable.values()),
+                    "RejectedByVariable": dict(self._rejected_by_variable),
+                    "RejectedByCommandType": dict(self._rejected_by_command_type)}
+
+
+    def _is_priority_command(self, variable_name: str, command_type: str) -> bool:
+        return any((priority_variable in ('*', variable_name)) and (priority_type in ('*', command_type))
+                   for (priority_variable, priority_type) in self._priority_commands)
+
+    def _get_variable_bucket(self, variable_name: str) -> TokenBucket | None:
+        if variable_name not in self._variable_buckets:
+            if self._default_variable_rate is None:
+                return None
+            self._variable_buckets[variable_name] = TokenBucket(*self._default_variable_rate)
+        return self._variable_buckets[variable_name]
+
+    def _count_rejection(self, variable_name: str, command_type: str) -> None:
+        self._rejected_by_variable[variable_name] = self._rejected_by_variable.get(variable_name, 0) + 1
+        self._rejected_by_command_type[command_type] = self._rejected_by_command_type.get(command_type, 0) + 1
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Union
+
+
+class MqttCommandCache:
+    """
+    A bounded cache of the responses to the last commands, keyed by variable name, command type, command ID and
+    the whole payload. When a command arrives twice, for example because of QoS 1 redelivery or a client retry, the
+    server answers with the cached response instead of executing it again against the hardware. The payload is part
+    of the key because IDs are dates, which can repeat for different commands sent at the same time.
+
+    Entries expire after time_to_live seconds, and when the cache is full the oldest entry is discarded.
+    """
+
+    def __init__(self, max_size: int=1024, time_to_live: float=60) -> None:
+        """
+        Raises ValueError.
+        """
+        if max_size < 0:
+            raise ValueError("Command cache size should be 0 or a positive integer.")
+        if time_to_live <= 0:
+            raise ValueError("Command cache time to live should be positive.")
+
+        self._max_size = max_size
+        self._time_to_live = time_to_live
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str, str, str], tuple[float, tuple[str, list[Union[int, float, str]]]]] = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+
+
+    def get_response(self, variable_name: str, command_type: str, command_id: str, payload: str) -> tuple[str, list[Union[int, float, str]]] | None:
+        """
+        Returns the cached response tuple of the command, or None if it haven't been cached or it have expired.
+        """
+        if self._max_size == 0:
+            return None
+        key = (variable_name, command_type, command_id, payload)
+        now = time.monotonic()
+        with self._lock:
+            self._remove_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return entry[1]
+
+
+    def save_response(self, variable_name: str, command_type: str, command_id: str, payload: str, response: tuple[str, list[Union[int, float, str]]]) -> None:
+        if self._max_size == 0:
+            return
+        key = (variable_name, command_type, command_id, payload)
+        # the response list is copied, as the variable could change the list it returned.
+        (response_code, response_list) = response
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._time_to_live, (response_code, list(response_list)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+    def get_statistics(self) -> dict[str, int]:
+        with self._lock:
+            return {"Hits": self._hits, "Misses": self._misses, "Size": len(self._entries)}
+
+
+    def _remove_expired(self, now: float) -> None:
+        # entries are ordered by insertion, and all of them have the same time to live, so the expired ones are first.
+        while len(self._entries) > 0:
+            (key, (expiration_time, _)) = next(iter(self._entries.items()))
+            if expiration_time > now:
+                break
+            del self._entries[key]
@@ -10,9 +10,13 @@ import threading
 import time
 from typing import Callable, Union
 import paho.mqtt.client as client_mqtt
-import socket
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 
 from base_class_python.MqttLogger import MqttLogger, MqttLogPriority
+import base_class_python.MqttResponseCodec as MqttResponseCodec
+from base_class_python.MqttSpool import MqttSpool
+import base_class_python.HostIdentity as HostIdentity
 
 class MqttConnection:
     """
@@ -23,13 +27,19 @@ class MqttConnection:
                  terminate_program_function: Callable,
                  logger: MqttLogger, name_for_connection: str,
                  mqtt_broker_ip: str, mqtt_broker_port: int=1883,
-                 username: str | None=None, password: str | None=None) -> None:
+                 username: str | None=None, password: str | None=None, mqtt_v5: bool=False, spool: MqttSpool | None=None) -> None:
         """
         It can receive only one broker, or a list of brokers, in which case the ports option turns 
         mandatory to be a list with the same length.
 
         The message handler and the on connect handler have to be defined outside this class. 
         They should be in paho mqtt-compatible format.
+
+        If mqtt_v5 is True, the connection uses MQTT v5 instead of v3.1.1, so messages can have properties, as 
+        response topic and correlation data.
+
+        If a spool is given, the messages sent with spool_when_disconnected while the broker is not connected are saved in it,
+        and replayed when the connection is recovered.
         """
 
         self._logger = logger
@@ -45,6 +55,14 @@ class MqttConnection:
 
         self._username = username 
         self._password = password
+
+        self._mqtt_v5 = mqtt_v5
+
+        self._spool = spool
+        self._connected = False
+
+        # resolved now, so NACK responses don't wait for DNS in the network thread.
+        self._host_identity = HostIdentity.get_host_identity()
         
         self._run_in_background = True
 
@@ -68,7 +86,10 @@ class MqttConnection:
                 self.on_connect_fail(None, None)
 
     
-    def on_disconnect(self, client, userdata,  rc):
+    def on_disconnect(self, client, userdata,  rc, properties=None):
+        self._connected = False
+        if self._spool is not None:
+            self._spool.stop_replay()
         if self._logger != None:
             self._logger.log("Disconnected from broker.", self._name, MqttLogPriority.ERROR)
         
@@ -81,16 +102,19 @@ class MqttConnection:
         self.try_connection()
 
 
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         if self._logger != None:
             self._logger.log("Connected to broker broker.", self._name, MqttLogPriority.INFO)
         for topic in self._topics_to_subscribe:
             self._client.subscribe(topic)
+        self._connected = True
+        if self._spool is not None and self._spool.has_messages():
+            self._spool.start_replay(self._publish_spooled_message)
         self.mqtt_on_connect_handler(client, userdata, flags, rc)
    
     
     def _init_mqtt_client(self):
-        self._client = client_mqtt.Client()
+        self._client = client_mqtt.Client(protocol=client_mqtt.MQTTv5 if self._mqtt_v5 else client_mqtt.MQTTv311)
         if (self._username != None and self._password != None):
             self._client.username_pw_set(self._username, self._password)
         self._client.on_connect = self.on_connect
@@ -115,44 +139,82 @@ class MqttConnection:
                 self.terminate_program_function()
         
         
-    def send_single_mqtt_message(self, topic: str, payload: str, qos: int = 0, retain: bool = False) -> None:
+    def send_single_mqtt_message(self, topic: str, payload: Union[str, bytes], qos: int = 0, retain: bool = False, properties: Properties | None = None,
+                                 spool_when_disconnected: bool = False) -> None:
         """
         To send a single message, its use is only recommended for monitor data.
+
+        With spool_when_disconnected, if the broker is not connected the message is saved in the spool of the connection, if it have one.
         """
+        if spool_when_disconnected and self._spool is not None and not self._connected:
+            self._spool.append(topic, payload, retain)
+            if self._connected:
+                # the connection have been recovered while appending, so the replay could have already finished.
+                self._spool.start_replay(self._publish_spooled_message)
+            return
         try:
-            self._client.publish(topic, payload, qos, retain)
+            info = self._client.publish(topic, payload, qos, retain, properties)
+            if spool_when_disconnected and self._spool is not None and info.rc == client_mqtt.MQTT_ERR_NO_CONN:
+                self._spool.append(topic, payload, retain)
         except Exception as e:
             if self._logger != None:
                 self._logger.log("Send single message failed: {}; {}:{}.".format(e, topic, payload), self._name, MqttLogPriority.ERROR)
 
     
-    def send_response(self, topic_of_response: str, response_code: str, command_id: str, response_list: list[Union[int, float, str]], topic_of_request: str, payload_of_request: str) -> None:
+    def send_response(self, topic_of_response: str, response_code: str, command_id: str, response_list: list[Union[int, float, str]], topic_of_request: str, payload_of_request: str,
+                      response_codec: MqttResponseCodec.MqttResponseCodec = MqttResponseCodec.default_codec, correlation_data: bytes | None = None) -> None:
         """
-        To send a response to the brocker. There are defined the formats of the response messages.
+        To send a response to the brocker. The formats of the response messages are defined in the response codecs.
+
+        In MQTT v5 mode, the correlation data of the request can be given to be sent back in the response properties.
         """
-        if response_code == 'DONE':
-            if response_list == []:
-                self.send_single_mqtt_message(topic_of_response, 'DONE;{}'.format(command_id))
+        properties = None
+        if self._mqtt_v5 and correlation_data is not None:
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.CorrelationData = correlation_data
+
+        try:
+            if response_code in ('DONE', 'ERROR'):
+                payload = response_codec.encode_response(response_code, command_id, response_list)
             else:
-                self.send_single_mqtt_message(topic_of_response, 'DONE;{};{}'.format(command_id, str(response_list)))
-        
-        elif response_code == 'ERROR':
-            self.send_single_mqtt_message(topic_of_response, 'ERROR;{};{}'.format(command_id, str(response_list)))
+                payload = response_codec.encode_nack(command_id, 'Not acquired in {}, error message: {}'.format(self._get_host_ip(), str(response_list)), topic_of_request, payload_of_request)
+        except Exception as e:
+            # this runs in the network thread, where an exception would end the program, so the client gets an ERROR in the default format.
+            if self._logger != None:
+                self._logger.log("Response couldn't be encoded in {} format: {}".format(response_codec.name, e), self._name, MqttLogPriority.ERROR)
+            payload = MqttResponseCodec.default_codec.encode_response('ERROR', command_id, ["Response couldn't be encoded in {} format: {}".format(response_codec.name, e)])
         
-        else:
-            self.send_single_mqtt_message(topic_of_response,'NACK_{}_{}_{}'.format(topic_of_request, payload_of_request, 'Not acquired in {}, error message: {}'.format(self._get_host_ip(), str(response_list))))
+        self.send_single_mqtt_message(topic_of_response, payload, properties=properties)
         
+    def is_mqtt_v5(self) -> bool:
+        return self._mqtt_v5
+
     def close_connection(self):
         self._run_in_background = False # important that this goes before loop_stop
 
         self._client.loop_stop()
+        if self._spool is not None:
+            self._spool.close()
 
 
-    def _get_host_ip(self):
+    def _publish_spooled_message(self, topic: str, payload: bytes) -> bool:
+        """
+        Spooled messages are sent without retain, as newer values could have been retained after the reconnection.
+        """
+        if not self._connected:
+            return False
         try:
-            hostname = socket.getfqdn()
-            return socket.gethostbyname_ex(hostname)[2][0]
-        except:
+            return self._client.publish(topic, payload, 0, False).rc == client_mqtt.MQTT_ERR_SUCCESS
+        except Exception as e:
+            if self._logger != None:
+                self._logger.log("Replay of spooled message failed: {}; {}.".format(e, topic), self._name, MqttLogPriority.ERROR)
+            return False
+
+
+    def _get_host_ip(self):
+        ip = self._host_identity.get_ip()
+        if ip is None:
             return "Could not get host"
+        return ip
         
         
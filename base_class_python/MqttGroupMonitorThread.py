@@ -0,0 +1,105 @@
+import time
+from threading import Thread
+
+from base_class_python.MqttHardwareVariableGroup import MqttHardwareVariableGroup
+from base_class_python.MqttMonitorThread import MqttMonitorThread
+from base_class_python.MqttLogger import MqttLogger, MqttLogPriority
+
+
+class MqttGroupMonitorThread(Thread):
+    """
+    Thread that monitors all the variables of a MqttHardwareVariableGroup. The monitor of each variable is
+    configured as usual in its MqttMonitorThread, which is not started, and this thread gives them the
+    measurements.
+
+    Each monitored variable is scheduled by its own period: the group is read when any of them is due, and the
+    variables that are due in that moment are read together, and processed with the same timestamp. Variables
+    monitored without period are read as fast as possible, with a pause of 10 ms between reads.
+    """
+
+    _minimum_period = 0.01
+    # variables due within this time are read together, so periods that are multiples of each other stay grouped.
+    _due_tolerance = 0.001
+
+    def __init__(self, monitored_group: MqttHardwareVariableGroup, variable_monitor_threads: list[MqttMonitorThread], logger: MqttLogger) -> None:
+        super().__init__(daemon=True)
+
+        self._should_run = True
+
+        self._logger = logger
+
+        self._monitored_group = monitored_group
+        self._variable_monitor_threads = variable_monitor_threads
+
+        # time at which each monitored variable have to be read next.
+        self._next_due_times: dict[str, float] = {}
+        self._last_measurement_time = time.time()
+
+        self.name = "{} group thread".format(self._monitored_group.get_group_name())
+
+
+    def run(self):
+        """
+        The method that is runned when the thread is alive. It reads the group when any variable is due, and fans out the measurements.
+        """
+        while self._should_run:
+            now = time.time()
+            # periods are read once, as they can be changed by commands during the iteration.
+            monitored_periods = [(monitor_thread, monitor_thread.get_period()) for monitor_thread in self._variable_monitor_threads if monitor_thread.is_monitoring()]
+            monitored_names = {monitor_thread.get_monitored_variable_name() for (monitor_thread, _) in monitored_periods}
+            for variable_name in list(self._next_due_times):
+                if variable_name not in monitored_names:
+                    # the monitor have been stoped, so it is due as soon as it is started again.
+                    del self._next_due_times[variable_name]
+
+            due_threads = [(monitor_thread, period) for (monitor_thread, period) in monitored_periods if self._next_due_times.get(monitor_thread.get_monitored_variable_name(), now) <= now + self._due_tolerance]
+            if len(due_threads) > 0:
+                self._process_group_measurements([monitor_thread for (monitor_thread, _) in due_threads])
+                self._schedule_next_measurements(due_threads, now)
+
+            next_due_time = min(self._next_due_times.values(), default=now + self._minimum_period)
+            time.sleep(max(next_due_time - time.time(), 0) if len(monitored_periods) > 0 else 0.1)
+
+
+    def stop_thread(self):
+        """
+        To be called at program ending.
+        """
+        self._should_run = False
+
+
+    def _schedule_next_measurements(self, due_threads: list[tuple[MqttMonitorThread, float | None]], now: float) -> None:
+        """
+        Each variable is scheduled one period after its previous due time, so the periods don't drift nor shrink.
+        """
+        overrun = False
+        for (monitor_thread, period) in due_threads:
+            variable_name = monitor_thread.get_monitored_variable_name()
+            if period is None:
+                self._next_due_times[variable_name] = now + self._minimum_period
+                continue
+            next_due_time = self._next_due_times.get(variable_name, now) + period
+            if next_due_time <= time.time():
+                # after an overrun, the next period starts counting from now.
+                overrun = True
+                next_due_time = time.time() + period
+            self._next_due_times[variable_name] = next_due_time
+        if overrun:
+            self._logger.log("Overrun in monitor thread handling group {}".format(self._monitored_group.get_group_name()), sender_name=self._monitored_group.get_group_name(), priority=MqttLogPriority.INFO)
+
+    def _process_group_measurements(self, due_threads: list[MqttMonitorThread]) -> None:
+        variable_names = [monitor_thread.get_monitored_variable_name() for monitor_thread in due_threads]
+
+        now = time.time()
+        delta_time = now - self._last_measurement_time
+        self._last_measurement_time = now
+
+        measurements = self._monitored_group.get_measurements_for_monitor(delta_time, variable_names)
+        timestamp = time.time()
+
+        for monitor_thread in due_threads:
+            variable_name = monitor_thread.get_monitored_variable_name()
+            if variable_name not in measurements:
+                self._logger.log("Group {} did not return a measurement for variable {}".format(self._monitored_group.get_group_name(), variable_name), sender_name=self._monitored_group.get_group_name(), priority=MqttLogPriority.ERROR)
+                continue
+            monitor_thread.process_measurement(measurements[variable_name], timestamp)
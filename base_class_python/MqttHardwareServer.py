@@ -1,5 +1,5 @@
 import json
-import socket
+import os
 import sys
 import time
 from typing import Callable, Union
@@ -7,11 +7,18 @@ from typing import Callable, Union
 from base_class_python.MqttConnection import MqttConnection
 from base_class_python.MqttMonitorThread import MqttMonitorThread
 from base_class_python.MqttHardwareVariable import MqttHardwareVariable
+from base_class_python.MqttHardwareVariableGroup import MqttHardwareVariableGroup
+from base_class_python.MqttGroupMonitorThread import MqttGroupMonitorThread
 from base_class_python.MqttParser import MqttParser
 from base_class_python.MonitorType import MonitorType
 from base_class_python.MqttLogger import MqttLogger, MqttLogPriority
+from base_class_python.MqttHistoryBuffer import MqttHistoryBuffer
+from base_class_python.MqttCommandCache import MqttCommandCache
+from base_class_python.MqttAdmissionControl import MqttAdmissionControl
+from base_class_python.MqttSpool import MqttSpool
 
 import base_class_python.DateUtility as DateUtility
+import base_class_python.HostIdentity as HostIdentity
 
 class MqttHardwareServer:
     """
@@ -19,7 +26,38 @@ class MqttHardwareServer:
     """
 
     def __init__(self, name: str, hardware_variable_list: list[MqttHardwareVariable], mqtt_broker_ip: str, 
-                 mqtt_broker_port: int=1883, topic_origin: str="", function_at_close: Callable=lambda:None, username: str | None=None, password: str | None=None):
+                 mqtt_broker_port: int=1883, topic_origin: str="", function_at_close: Callable=lambda:None, username: str | None=None, password: str | None=None,
+                 history_directory: str | None=None, command_cache_size: int=0, command_cache_time_to_live: float=60,
+                 admission_control: MqttAdmissionControl | None=None, mqtt_v5: bool=False, shared_subscription_group: str | None=None, read_only_replica: bool=False,
+                 hardware_variable_group_list: list[MqttHardwareVariableGroup] | None=None, spool: MqttSpool | None=None):
+        """
+        The variables of each group in hardware_variable_group_list are added to the server, and monitored together.
+
+        If a spool is given, monitor data produced while the broker is disconnected is saved in it, and replayed after reconnecting.
+
+        If history_directory is given, the monitored values of the variables that have a history size will be saved in
+        files of that directory, to be requested with HISTORY commands. HISTORY responses are decimated to at most 10000 samples.
+
+        If command_cache_size is positive, the responses of the last command_cache_size commands are cached during 
+        command_cache_time_to_live seconds, so commands repeated with the same ID and payload, as QoS 1 redeliveries, 
+        are not executed twice. The cache is disabled by default.
+
+        If admission_control is given, commands exceeding its rate limits are rejected with an ERROR response without
+        being executed or logged.
+
+        With mqtt_v5, commands that have response topic and correlation data properties are answered in that response topic,
+        with the same correlation data, and their ID can be left empty. If a shared_subscription_group is also given, the 
+        read-only commands topics are subscribed as $share/<group>/commands/<variable>/read, so the GET, INFO and HISTORY
+        commands sent there are shared between the servers of the group. The commands/<variable> topics are subscribed as 
+        usual, so the server that owns the hardware receives all the commands; read_only_replica servers don't subscribe 
+        them, and only handle the shared read-only commands.
+
+        Raises ValueError.
+        """
+        if shared_subscription_group is not None and not mqtt_v5:
+            raise ValueError("Shared subscriptions are only supported in MQTT v5 mode.")
+        if read_only_replica and shared_subscription_group is None:
+            raise ValueError("Read-only replicas need a shared subscription group.")
         
         self._init_class_defaults()
         
@@ -32,6 +70,18 @@ class MqttHardwareServer:
         self._topic_origin = topic_origin
         self._reconections = -1
 
+        self._history_directory = history_directory
+
+        self._command_cache = MqttCommandCache(max_size=command_cache_size, time_to_live=command_cache_time_to_live)
+        self._admission_control = admission_control
+
+        self._shared_subscription_group = shared_subscription_group
+        self._read_only_replica = read_only_replica
+
+        self._host_identity = HostIdentity.get_host_identity()
+        # variable name to (info version, host ip, INFO response), so INFO commands don't rebuild the response.
+        self._info_cache: dict[str, tuple[int, str, str]] = {}
+
         self._parser = MqttParser(topic_origin=self._topic_origin)
 
         self._logger = MqttLogger()
@@ -43,18 +93,27 @@ class MqttHardwareServer:
                                             mqtt_broker_port=mqtt_broker_port,
                                             username=username,
                                             password=password,
+                                            mqtt_v5=mqtt_v5,
+                                            spool=spool,
                                             logger = self._logger,
                                             name_for_connection = self._name)
         
         self._logger.load_connection(connection=self._connection)
+        if self._host_identity.get_ip() is None:
+            self._logger.log("IP can't be resolved", sender_name=self.get_server_name(), priority=MqttLogPriority.ERROR)
         
 
         self._hardware_variable_list: list[MqttHardwareVariable] = []
         self._monitor_thread_list: list[MqttMonitorThread] = []
+        self._hardware_variable_group_list: list[MqttHardwareVariableGroup] = []
+        self._group_monitor_thread_list: list[MqttGroupMonitorThread] = []
 
         for variable in hardware_variable_list:
             self.add_hardware_variable(variable)
 
+        for variable_group in hardware_variable_group_list or []:
+            self.add_hardware_variable_group(variable_group)
+
 
     def run_forever(self):
         """
@@ -72,19 +131,45 @@ class MqttHardwareServer:
 
 
     def add_hardware_variable(self, hardware_variable: MqttHardwareVariable):
+        monitor_thread = self._register_hardware_variable(hardware_variable)
+        monitor_thread.start()
 
+
+    def add_hardware_variable_group(self, hardware_variable_group: MqttHardwareVariableGroup):
+        """
+        Adds all the variables of the group. Their monitors are handled by one thread of the group, which reads all of them together.
+        """
+        self._hardware_variable_group_list.append(hardware_variable_group)
+
+        variable_monitor_threads = [self._register_hardware_variable(variable) for variable in hardware_variable_group.get_group_variables()]
+
+        group_monitor_thread = MqttGroupMonitorThread(monitored_group=hardware_variable_group,
+                                                      variable_monitor_threads=variable_monitor_threads,
+                                                      logger=self._logger)
+        self._group_monitor_thread_list.append(group_monitor_thread)
+        group_monitor_thread.start()
+
+
+    def _register_hardware_variable(self, hardware_variable: MqttHardwareVariable) -> MqttMonitorThread:
+        """
+        Subscribes to the commands of the variable, and returns its monitor thread without starting it.
+        """
         self._hardware_variable_list.append(hardware_variable)
 
         command_topic = self._topic_origin + "commands/{}".format(hardware_variable.get_variable_name())
-        self._connection.subscribe(command_topic)
+        if not self._read_only_replica:
+            self._connection.subscribe(command_topic)
+        if self._shared_subscription_group is not None:
+            self._connection.subscribe("$share/{}/{}/{}".format(self._shared_subscription_group, command_topic, self._parser.read_subtopic))
 
         monitor_thread = MqttMonitorThread(monitored_variable=hardware_variable,
                                             connection=self._connection,
                                             topic_origin=self._topic_origin,
-                                            logger=self._logger)
+                                            logger=self._logger,
+                                            history_buffer=self._create_history_buffer(hardware_variable))
 
         self._monitor_thread_list.append(monitor_thread)
-        monitor_thread.start()
+        return monitor_thread
 
 
     def get_server_name(self):
@@ -92,6 +177,20 @@ class MqttHardwareServer:
     
     def get_logger(self) -> MqttLogger:
         return self._logger
+
+    def get_command_cache_statistics(self) -> dict[str, int]:
+        """
+        Returns the number of hits and misses of the command cache, and its current size.
+        """
+        return self._command_cache.get_statistics()
+
+    def get_admission_statistics(self) -> dict[str, int | dict[str, int]] | None:
+        """
+        Returns the number of admitted and rejected commands, or None if the server have no admission control.
+        """
+        if self._admission_control is None:
+            return None
+        return self._admission_control.get_statistics()
         
 
     def _mqtt_on_connect_handler(self, client, userdata, flags, rc):
@@ -104,17 +203,45 @@ class MqttHardwareServer:
     def _mqtt_message_handler(self, client, userdata, msg):
         topic = msg.topic
         payload = msg.payload.decode("utf-8")
-        response_topic = topic.replace('commands', 'responses')
-        self._logger.log("Message recived in topic: {}, payload: {}".format(topic, payload), sender_name=self.get_server_name(), priority=MqttLogPriority.INFO)
+        is_read_topic = self._parser.is_read_topic(topic)
+        if is_read_topic:
+            response_topic = topic[:-len(self._parser.read_subtopic) - 1].replace('commands', 'responses')
+        else:
+            response_topic = topic.replace('commands', 'responses')
+
+        # MQTT v5 commands can ask to be answered in their own response topic, identified by correlation data.
+        properties = getattr(msg, 'properties', None)
+        correlation_data = getattr(properties, 'CorrelationData', None)
+        if getattr(properties, 'ResponseTopic', None):
+            response_topic = properties.ResponseTopic
         
         try:
-            (command_name, command_type, command_id, parameters) = self._parser.parse_mqtt_command(topic, payload)
+            (command_name, command_type, command_id, parameters, response_codec) = self._parser.parse_mqtt_command(topic, payload, command_id_required=correlation_data is None)
         except ValueError as error:
-            self._connection.send_response(response_topic, 'NACK', 'no_id', [str(error)], topic, payload)
+            self._connection.send_response(response_topic, 'NACK', 'no_id', [str(error)], topic, payload, correlation_data=correlation_data)
+            return
+
+        if command_id == "":
+            command_id = correlation_data.hex()
+
+        if is_read_topic and command_type not in self._read_only_command_types:
+            self._connection.send_response(response_topic, 'ERROR', command_id, ["Only {} commands can be sent to the read-only topic {}.".format(", ".join(self._read_only_command_types), topic)], topic, payload, response_codec, correlation_data)
             return
         
-        (response_code, response_list) = self._handle_command(command_name, command_type, parameters)
-        self._connection.send_response(response_topic, response_code, command_id, response_list, topic, payload)
+        cached_response = self._command_cache.get_response(command_name, command_type, command_id, payload)
+        if cached_response is not None:
+            self._logger.log("Repeated command {} with id {} in variable {}, answered from cache.".format(command_type, command_id, command_name), sender_name=self.get_server_name(), priority=MqttLogPriority.INFO)
+            (response_code, response_list) = cached_response
+        else:
+            (admitted, rejection_reason) = (True, "") if self._admission_control is None else self._admission_control.admit_command(command_name, command_type)
+            if admitted:
+                # logs are also sent to the broker, so only admitted commands are logged, and a flood is rejected quickly.
+                self._logger.log("Message recived in topic: {}, payload: {}".format(topic, payload), sender_name=self.get_server_name(), priority=MqttLogPriority.INFO)
+                (response_code, response_list) = self._handle_command(command_name, command_type, parameters)
+                self._command_cache.save_response(command_name, command_type, command_id, payload, (response_code, response_list))
+            else:
+                (response_code, response_list) = ('ERROR', ["Command rejected by admission control: {}".format(rejection_reason)])
+        self._connection.send_response(response_topic, response_code, command_id, response_list, topic, payload, response_codec, correlation_data)
 
 
     def close_program(self, exit_code=1):
@@ -122,12 +249,23 @@ class MqttHardwareServer:
         Make shure that this method is called at program ending, if not, some threads will be alive.
         """
         self._logger.log("Program ending...", self._name, MqttLogPriority.INFO)
-        self._connection.close_connection()
+        # monitor threads are stopped first, as they send data through the connection.
+        for group_monitor_thread in self._group_monitor_thread_list:
+            group_monitor_thread.stop_thread()
+
         for monitor_thread in self._monitor_thread_list:
             monitor_thread.stop_thread()
+            if monitor_thread.get_history_buffer() is not None:
+                monitor_thread.get_history_buffer().close()
+
+        self._connection.close_connection()
+        self._host_identity.stop()
         
         for variable in self._hardware_variable_list:
             variable.stop_variable()
+
+        for variable_group in self._hardware_variable_group_list:
+            variable_group.stop_group()
         
         self._function_at_close()
         self._run_main_thread = False
@@ -156,26 +294,34 @@ class MqttHardwareServer:
             return target_variable.handle_put_command(parameters)
         
         elif command_type == 'INFO':
+            host_ip = self._get_ip()
+            cached_info = self._info_cache.get(variable_name)
+            if cached_info is not None and cached_info[0] == target_variable.get_info_version() and cached_info[1] == host_ip:
+                return ("DONE", [cached_info[2]])
+
+            info_version = target_variable.get_info_version()
             user_configured_dict = target_variable.handle_info_command()
 
-            default_dict = {"HostIp" : self._get_ip(),
+            default_dict = {"HostIp" : host_ip,
                             "VariableName" : target_variable.get_variable_name(),
                             "AppName" : sys.argv[0]}
             
             default_dict.update(user_configured_dict)
 
-            return ("DONE", [json.dumps(default_dict)])
+            info_response = json.dumps(default_dict)
+            self._info_cache[variable_name] = (info_version, host_ip, info_response)
+            return ("DONE", [info_response])
         
 
         elif command_type == 'MONITOR':
             target_thread = next((thread for thread in self._monitor_thread_list if thread.get_monitored_variable_name() == variable_name), None)
             if target_thread == None:
                 return ('ERROR', ["Variable {} have not monitor thread.".format(variable_name)])
-            if len(parameters) not in (1, 2, 3):
-                return ('ERROR', ["Monitor command only acepts 1, 2 or 3 parameters."])
+            if len(parameters) not in (1, 2, 3, 4, 5):
+                return ('ERROR', ["Monitor command only acepts 1, 2, 3, 4 or 5 parameters."])
             
             if parameters[0] == 1:
-                if len(parameters) == 3:
+                if len(parameters) >= 3:
                     try:
                         mode = MonitorType.from_string(parameters[1])
                     except ValueError as e:
@@ -195,11 +341,27 @@ class MqttHardwareServer:
                 if mode == MonitorType.inactive:
                     return ('ERROR', ["Setting inactive monitoring isn't possible. Just turn of the monitor."])
                 
+                report_period = None
+                statistics = None
+                if mode == MonitorType.aggregate:
+                    try:
+                        report_period = float(parameters[3]) if len(parameters) >= 4 else self._default_aggregate_report_period
+                    except (ValueError, TypeError):
+                        return ('ERROR', ["Report period should be a number."])
+                    if len(parameters) == 5:
+                        statistics = parameters[4]
+                        if type(statistics) != list:
+                            return ('ERROR', ["Statistics should be in list format, for example ['min', 'max']."])
+                elif len(parameters) > 3:
+                    return ('ERROR', ["Only aggregate monitor mode acepts report period and statistics parameters."])
+                
                 if target_variable.handle_start_monitor_request_command(mode, period):
                     try:
-                        target_thread.start_monitor(mode, period)
+                        target_thread.start_monitor(mode, period, report_period, statistics)
                     except ValueError as e:
                         return ('ERROR', [str(e)])
+                    if mode == MonitorType.aggregate:
+                        return ('DONE', ["Monitor started in variable {} with mode {}, period {} and report period {}.".format(variable_name, mode, period, report_period)])
                     return ('DONE', ["Monitor started in variable {} with mode {} and period {}.".format(variable_name, mode, period)])
                 else:
                     return ('ERROR', ["Target variable {} refused to start monitoring with mode {} and period {}. Check if MONITOR is supported for this variable.".format(variable_name, mode, period)])
@@ -210,6 +372,25 @@ class MqttHardwareServer:
             else:
                 return ('ERROR', ["Monitor commands first argument should be 1 or 0."])
             
+        elif command_type == 'HISTORY':
+            target_thread = next((thread for thread in self._monitor_thread_list if thread.get_monitored_variable_name() == variable_name), None)
+            if target_thread == None or target_thread.get_history_buffer() is None:
+                return ('ERROR', ["Variable {} does not save history.".format(variable_name)])
+            if len(parameters) > 3:
+                return ('ERROR', ["History command only acepts 0, 1, 2 or 3 parameters."])
+            
+            try:
+                start_timestamp = self._parse_history_time(parameters[0]) if len(parameters) > 0 else float('-inf')
+                end_timestamp = self._parse_history_time(parameters[1]) if len(parameters) > 1 else float('inf')
+                max_samples = int(parameters[2]) if len(parameters) > 2 else self._max_history_samples
+                # responses are built in the network thread, so they are always limited.
+                max_samples = min(max_samples, self._max_history_samples)
+                samples = target_thread.get_history_buffer().get_range(start_timestamp, end_timestamp, max_samples)
+            except (ValueError, TypeError, OverflowError) as e:
+                return ('ERROR', ["Incorrect history parameters: {}".format(e)])
+
+            return ('DONE', [json.dumps([[DateUtility.timestamp_to_date_string(timestamp), value] for (timestamp, value) in samples])])
+
 
         else:
             return ('ERROR', ['Command type {} not supported.'.format(command_type)])
@@ -219,15 +400,36 @@ class MqttHardwareServer:
     def _init_class_defaults(self):
         self._default_monitor_mode = MonitorType.periodic
         self._default_monitor_period = 0.1
+        self._default_aggregate_report_period = 1.0
+        self._max_history_samples = 10000
+        self._read_only_command_types = ('GET', 'INFO', 'HISTORY')
+
+    
+    def _create_history_buffer(self, hardware_variable: MqttHardwareVariable) -> MqttHistoryBuffer | None:
+        if self._history_directory is None or hardware_variable.get_history_size() <= 0:
+            return None
+        file_path = os.path.join(self._history_directory, "{}.hist".format(hardware_variable.get_variable_name()))
+        return MqttHistoryBuffer(file_path, hardware_variable.get_history_size())
+
+    def _parse_history_time(self, time_parameter: Union[int, float, str]) -> float:
+        """
+        History times can be given as UNIX timestamps, or as date strings in the same format as monitor data.
+
+        Raises ValueError.
+        """
+        if type(time_parameter) == str:
+            return DateUtility.date_string_to_timestamp(time_parameter)
+        return float(time_parameter)
 
     
     def _get_ip(self):
-        try:
-            hostname = socket.getfqdn()
-            return socket.gethostbyname_ex(hostname)[2][0]
-        except:
-            self._logger.log("IP can't be resolved", sender_name=self.get_server_name(), priority=MqttLogPriority.ERROR)
-            return "Not resolved, hostname = {}".format(socket.getfqdn())
+        """
+        The IP is resolved in the background by the host identity, so this never waits for DNS.
+        """
+        ip = self._host_identity.get_ip()
+        if ip is None:
+            return "Not resolved, hostname = {}".format(self._host_identity.get_hostname())
+        return ip
         
         
             
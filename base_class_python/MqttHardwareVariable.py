@@ -57,6 +57,7 @@ class MqttHardwareVariable(metaclass = ABCMeta):
             -Unit
             -SuportedCommands
             -Info
+        The INFO response is cached by the server, so if the returned fields change, signal_info_changed should be called.
         """
         pass
 
@@ -79,4 +80,22 @@ class MqttHardwareVariable(metaclass = ABCMeta):
         """
         Make shure to call any closeup logic for your hardware here.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def signal_info_changed(self) -> None:
+        """
+        Call this method when the fields returned by handle_info_command change, so the next INFO command gets them again.
+        """
+        self._info_version = self.get_info_version() + 1
+
+    def get_info_version(self) -> int:
+        return getattr(self, '_info_version', 0)
+
+    def get_history_size(self) -> int:
+        """
+        Override this method to save the monitored values of this variable in a history buffer, which can be
+        requested with HISTORY commands. It should return the maximum number of samples to save, or 0 to
+        disable the history. Only numeric values are saved.
+        The history is only saved if the server have been created with a history_directory.
+        """
+        return 0
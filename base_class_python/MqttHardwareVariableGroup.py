@@ -0,0 +1,45 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union
+from base_class_python.MqttHardwareVariable import MqttHardwareVariable
+
+class MqttHardwareVariableGroup(metaclass = ABCMeta):
+    """
+    This is the abstract base class for groups of hardware variables that can be measured all together, for
+    example the channels of a multichannel DAQ card or the registers of a PLC, read in one bus transaction.
+
+    The variables of the group handle their commands as any other variable, but they are monitored by a single
+    thread of the group. Each tick, all the monitored variables are read with one call to
+    get_measurements_for_monitor, and all of them are published with the same timestamp. Therefore, the
+    get_measurement_for_monitor method of the variables is not called.
+    """
+
+    @abstractmethod
+    def get_group_name(self) -> str:
+        """
+        The group name is used to name the group monitor thread and in the logs.
+        """
+        pass
+
+    @abstractmethod
+    def get_group_variables(self) -> list[MqttHardwareVariable]:
+        """
+        It should return the variables of the group. They will be added to the server when the group is added.
+        """
+        pass
+
+    @abstractmethod
+    def get_measurements_for_monitor(self, delta_time: float, variable_names: list[str]) -> dict[str, Union[int, float, str]]:
+        """
+        Each time new measurements are needed from the group monitor thread, this method will be called with the
+        names of the variables that have to be published. It should return a dict from variable name to measurement,
+        with at least the requested variables.
+        """
+        pass
+
+    @abstractmethod
+    def stop_group(self) -> None:
+        """
+        Make shure to call any closeup logic for the shared hardware here. The stop_variable method of each variable
+        is also called.
+        """
+        pass
@@ -0,0 +1,175 @@
+import math
+import mmap
+import os
+import struct
+import threading
+
+
+class MqttHistoryBuffer:
+    """
+    A fixed size ring buffer of (timestamp, value) samples, stored in a memory mapped file in local disk.
+    It is used by monitor threads to keep the recent history of a variable, so it can be requested later
+    with HISTORY commands.
+
+    Only numeric values can be saved, as each sample is stored as two doubles. When the buffer is full,
+    the oldest samples are overwritten. If the file already exists with the same capacity, the samples
+    saved in it are kept, so the history survives program restarts.
+
+    Samples are kept in time order, so samples older than the newest saved one, for example after the
+    system clock is set backwards, are discarded. If a sample is older by more than clock_jump_threshold
+    seconds, the clock have jumped backwards, and instead of discarding samples until it reaches the newest
+    one again, the buffer is cleared and the history starts again from that sample.
+    """
+
+    _MAGIC = b'MQHB'
+    _VERSION = 1
+    _HEADER = struct.Struct('<4sIQQQ') # magic, version, capacity, next write index, sample count
+    _SAMPLE = struct.Struct('<dd') # timestamp, value
+
+    def __init__(self, file_path: str, capacity: int, clock_jump_threshold: float=60) -> None:
+        """
+        Raises ValueError.
+        """
+        if capacity <= 0:
+            raise ValueError("History buffer capacity should be a positive integer.")
+        if clock_jump_threshold < 0:
+            raise ValueError("History buffer clock jump threshold should be 0 or positive.")
+
+        self._file_path = file_path
+        self._capacity = capacity
+        self._clock_jump_threshold = clock_jump_threshold
+        self._lock = threading.Lock()
+        self._closed = False
+
+        file_size = self._HEADER.size + self._SAMPLE.size * capacity
+
+        directory = os.path.dirname(file_path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        reuse_file = os.path.isfile(file_path) and os.path.getsize(file_path) == file_size
+        self._file = open(file_path, 'r+b' if os.path.isfile(file_path) else 'w+b')
+        if not reuse_file:
+            self._file.truncate(file_size)
+        self._map = mmap.mmap(self._file.fileno(), file_size)
+
+        if reuse_file:
+            (magic, version, stored_capacity, self._next_index, self._count) = self._HEADER.unpack_from(self._map, 0)
+            reuse_file = magic == self._MAGIC and version == self._VERSION and stored_capacity == capacity
+
+        if not reuse_file:
+            self._next_index = 0
+            self._count = 0
+            self._write_header()
+
+        self._newest_timestamp = self._read_sample(self._count - 1)[0] if self._count > 0 else float('-inf')
+        self._discarded_samples = 0
+        self._resets = 0
+
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """
+        Saves a new sample, overwriting the oldest one if the buffer is full. Samples older than the newest
+        saved one are discarded, as get_range needs the samples in time order, unless they are older by more
+        than the clock jump threshold, in which case the buffer is cleared first.
+
+        Returns False if the sample have been discarded.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if timestamp < self._newest_timestamp:
+                if self._newest_timestamp - timestamp <= self._clock_jump_threshold:
+                    self._discarded_samples += 1
+                    return False
+                self._next_index = 0
+                self._count = 0
+                self._resets += 1
+            self._newest_timestamp = timestamp
+            self._SAMPLE.pack_into(self._map, self._sample_offset(self._next_index), timestamp, value)
+            self._next_index = (self._next_index + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+            self._write_header()
+            return True
+
+
+    def get_range(self, start_timestamp: float, end_timestamp: float, max_samples: int | None=None) -> list[tuple[float, float]]:
+        """
+        Returns the saved samples with start_timestamp <= timestamp <= end_timestamp, from older to newer.
+
+        If max_samples is given and there are more samples in the range, they are decimated taking one
+        of each N samples, so at most max_samples are returned.
+
+        Raises ValueError.
+        """
+        if max_samples is not None and max_samples <= 0:
+            raise ValueError("The maximum number of samples should be a positive integer.")
+
+        with self._lock:
+            if self._closed or self._count == 0:
+                return []
+
+            # samples are saved in time order, so the limits of the range can be bisected.
+            first = self._bisect(start_timestamp, include_equal=False)
+            last = self._bisect(end_timestamp, include_equal=True)
+            if last <= first:
+                return []
+
+            step = 1
+            if max_samples is not None:
+                step = max(1, math.ceil((last - first) / max_samples))
+
+            return [self._read_sample(position) for position in range(first, last, step)]
+
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_sample_count(self) -> int:
+        return self._count
+
+    def get_discarded_count(self) -> int:
+        return self._discarded_samples
+
+    def get_reset_count(self) -> int:
+        """
+        Returns how many times the buffer have been cleared because the clock jumped backwards.
+        """
+        return self._resets
+
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+
+    def _bisect(self, timestamp: float, include_equal: bool) -> int:
+        """
+        Returns the first position (0 being the oldest sample) with a timestamp bigger than the given one,
+        or bigger or equal if include_equal is False.
+        """
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            middle_timestamp = self._read_sample(middle)[0]
+            if middle_timestamp < timestamp or (include_equal and middle_timestamp == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _read_sample(self, position: int) -> tuple[float, float]:
+        oldest_index = (self._next_index - self._count) % self._capacity
+        return self._SAMPLE.unpack_from(self._map, self._sample_offset((oldest_index + position) % self._capacity))
+
+    def _sample_offset(self, index: int) -> int:
+        return self._HEADER.size + index * self._SAMPLE.size
+
+    def _write_header(self) -> None:
+        self._HEADER.pack_into(self._map, 0, self._MAGIC, self._VERSION, self._capacity, self._next_index, self._count)
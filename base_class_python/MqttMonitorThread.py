@@ -6,6 +6,7 @@
 
 
 from collections.abc import Callable, Iterable, Mapping
+import json
 import time
 from threading import Thread
 from typing import Any
@@ -18,18 +19,23 @@ from base_class_python.MqttHardwareVariable import MqttHardwareVariable
 from base_class_python.MqttConnection import MqttConnection
 from base_class_python.MonitorType import MonitorType
 from base_class_python.MqttLogger import MqttLogger, MqttLogPriority
+from base_class_python.MqttHistoryBuffer import MqttHistoryBuffer
+from base_class_python.StreamingStatistics import StreamingStatistics
 
 
 class MqttMonitorThread(Thread):
     """
     Class that inerits from Thread. It communicates with a MqttHardwareVariable, 
     to monitor its value in the way it have been configured trought commands.
+
+    For variables of a MqttHardwareVariableGroup the thread is not started, and the measurements
+    are given by the group monitor thread with process_measurement.
     """
 
     def __init__(self, monitored_variable: MqttHardwareVariable, connection: MqttConnection, logger: MqttLogger, topic_origin: str="",
                  group: None = None, target: Union[Callable[..., object], None] = None, 
                  name: Union[str, None] = None, args: Iterable[Any] = ..., kwargs: Union[Mapping[str, Any], None] = None, *, 
-                 daemon: Union[bool, None] = None) -> None:
+                 daemon: Union[bool, None] = None, history_buffer: MqttHistoryBuffer | None=None) -> None:
         super().__init__(group, target, name, args, kwargs, daemon=daemon)
 
         self.daemon = True
@@ -41,6 +47,8 @@ class MqttMonitorThread(Thread):
 
         self._monitored_variable = monitored_variable
         self._monitor_topic = topic_origin + "data/{}".format(self.get_monitored_variable_name())
+        self._history_buffer = history_buffer
+        self._discarding_history = False
 
         self._last_measurement = None
         self._previous_measurement = None
@@ -50,6 +58,11 @@ class MqttMonitorThread(Thread):
         self._period = None
         self._send_monitor_data = False
 
+        self._report_period = None
+        self._statistics = None
+        self._last_report_time = time.time()
+        self._last_invalid_measurement = None
+
         self.name = "{} thread".format(self.get_monitored_variable_name())
   
   
@@ -60,15 +73,8 @@ class MqttMonitorThread(Thread):
         current_iteration_start_time = time.time()
         while self._should_run:
             if self._send_monitor_data:
-                if self._mode == MonitorType.periodic:
-                    self._connection.send_single_mqtt_message(self._monitor_topic, '{};{}'.format(str(self._get_measurement()), DateUtility.get_date_string()), retain=True)
-
-                elif self._mode == MonitorType.change:
-                    self._get_measurement()
-                    if self._previous_measurement != self._last_measurement:
-                        self._connection.send_single_mqtt_message(self._monitor_topic, '{};{}'.format(str(self._last_measurement), DateUtility.get_date_string()), retain=True)
-                else:
-                    raise ValueError("_mode should never be {}, it can only be 'periodic' or 'change'.".format(self._mode))
+                measurement = self._get_measurement()
+                self.process_measurement(measurement, time.time())
                 
                 currently_erased_time = time.time() - current_iteration_start_time
                 try:
@@ -94,10 +100,13 @@ class MqttMonitorThread(Thread):
 
 
 
-    def start_monitor(self, mode: Union[MonitorType, str], period: float) -> None:
+    def start_monitor(self, mode: Union[MonitorType, str], period: float, report_period: float | None=None, statistics: list[str] | None=None) -> None:
         """
         Start monitoring the threads variable with the specified mode and period.
 
+        In aggregate mode the variable is sampled each period, but only a summary with the selected statistics
+        is published each report_period.
+
         Raises ValueError.
         """
 
@@ -113,8 +122,19 @@ class MqttMonitorThread(Thread):
         elif mode == MonitorType.change:
             self._mode = MonitorType.change
             self._period = period
+        elif mode == MonitorType.aggregate:
+            if period == None:
+                raise ValueError("Aggregate monitor mode needs a sampling period.")
+            if report_period == None or report_period < period:
+                raise ValueError("Report period should be bigger or equal than the sampling period in aggregate monitor mode.")
+            # statistics are created before changing the mode, as the thread could be using the previous ones.
+            self._statistics = StreamingStatistics(statistics)
+            self._report_period = report_period
+            self._last_report_time = time.time()
+            self._mode = MonitorType.aggregate
+            self._period = period
         else:
-            raise ValueError("Monitor mode {} not supported. Use 'periodic' or 'change' only.".format(mode))
+            raise ValueError("Monitor mode {} not supported. Use 'periodic', 'change' or 'aggregate' only.".format(mode))
 
         self._send_monitor_data = True
 
@@ -122,20 +142,106 @@ class MqttMonitorThread(Thread):
         self._mode = MonitorType.inactive
         self._period = None
         self._send_monitor_data = False
+        self._report_period = None
+        self._statistics = None
 
-    def _get_measurement(self) -> Union[int, float, str]:
+    def process_measurement(self, measurement: Union[int, float, str], timestamp: float) -> None:
+        """
+        Publishes the measurement taken at timestamp, or adds it to the statistics, depending on the monitor mode.
+        """
         self._previous_measurement = self._last_measurement
+        self._last_measurement = measurement
+
+        if self._mode == MonitorType.periodic:
+            self._publish_measurement(measurement, timestamp)
+
+        elif self._mode == MonitorType.change:
+            if self._previous_measurement != self._last_measurement:
+                self._publish_measurement(measurement, timestamp)
+
+        elif self._mode == MonitorType.aggregate:
+            self._aggregate_measurement(measurement, timestamp)
+
+        elif self._mode == MonitorType.inactive:
+            # the monitor have been stoped while measuring.
+            pass
+        else:
+            raise ValueError("_mode should never be {}, it can only be 'periodic', 'change' or 'aggregate'.".format(self._mode))
 
+    def _get_measurement(self) -> Union[int, float, str]:
         now = time.time()
         delta_time = now - self._last_measurement_time
         self._last_measurement_time = now
 
-        self._last_measurement = self._monitored_variable.get_measurement_for_monitor(delta_time)
-        return self._last_measurement
+        return self._monitored_variable.get_measurement_for_monitor(delta_time)
+    
+    def _publish_measurement(self, measurement: Union[int, float, str], timestamp: float) -> None:
+        """
+        Sends the measurement to the monitor topic, and saves it in the history buffer if there is one.
+        """
+        self._connection.send_single_mqtt_message(self._monitor_topic, '{};{}'.format(str(measurement), DateUtility.timestamp_to_date_string(timestamp)), retain=True, spool_when_disconnected=True)
+        self._record_in_history(timestamp, measurement)
+
+    def _aggregate_measurement(self, measurement: Union[int, float, str], timestamp: float) -> None:
+        """
+        Adds the measurement to the statistics, and publishes their summary if the report period have elapsed.
+        """
+        statistics = self._statistics
+        report_period = self._report_period
+        if statistics is None or report_period is None:
+            # the monitor have been stoped inside the loop.
+            return
+
+        try:
+            statistics.add(float(measurement))
+            self._record_in_history(timestamp, measurement)
+        except (TypeError, ValueError):
+            # logs are also sent to the broker, so non numeric values are only counted here, and logged once per report.
+            statistics.add_invalid()
+            self._last_invalid_measurement = measurement
+
+        if timestamp - self._last_report_time >= report_period:
+            if statistics.get_invalid_count() > 0:
+                self._logger.log("{} non numeric values, as {}, couldn't be aggregated in variable {}".format(statistics.get_invalid_count(), self._last_invalid_measurement, self.get_monitored_variable_name()), sender_name=self.get_monitored_variable_name(), priority=MqttLogPriority.WARN)
+            self._connection.send_single_mqtt_message(self._monitor_topic, '{};{}'.format(json.dumps(statistics.get_summary()), DateUtility.timestamp_to_date_string(timestamp)), retain=True, spool_when_disconnected=True)
+            statistics.reset()
+            self._last_report_time += report_period
+            if timestamp - self._last_report_time >= report_period:
+                # after an overrun, the next report starts counting from now.
+                self._last_report_time = timestamp
+
+    def _record_in_history(self, timestamp: float, measurement: Union[int, float, str]) -> None:
+        if self._history_buffer is None:
+            return
+        try:
+            value = float(measurement)
+        except (TypeError, ValueError):
+            # only numeric values can be saved in the history.
+            return
+
+        (discarded_count, reset_count) = (self._history_buffer.get_discarded_count(), self._history_buffer.get_reset_count())
+        if not self._history_buffer.append(timestamp, value):
+            # logs are sent to the broker, so only the first discarded sample is logged. Samples are also not saved once the buffer is closed.
+            if not self._discarding_history and self._history_buffer.get_discarded_count() != discarded_count:
+                self._discarding_history = True
+                self._logger.log("History of variable {} have newer samples than {}, the clock may have gone backwards. Samples will be discarded until the clock reaches them.".format(self.get_monitored_variable_name(), DateUtility.timestamp_to_date_string(timestamp)), sender_name=self.get_monitored_variable_name(), priority=MqttLogPriority.WARN)
+            return
+        self._discarding_history = False
+        if self._history_buffer.get_reset_count() != reset_count:
+            self._logger.log("History of variable {} have been cleared, as the clock have gone backwards to {}.".format(self.get_monitored_variable_name(), DateUtility.timestamp_to_date_string(timestamp)), sender_name=self.get_monitored_variable_name(), priority=MqttLogPriority.WARN)
     
     def get_monitored_variable_name(self) -> str:
         return self._monitored_variable.get_variable_name()
 
+    def get_history_buffer(self) -> MqttHistoryBuffer | None:
+        return self._history_buffer
+
+    def is_monitoring(self) -> bool:
+        return self._send_monitor_data
+
+    def get_period(self) -> float | None:
+        return self._period
+
     
     def stop_thread(self):
         """
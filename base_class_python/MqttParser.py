@@ -7,18 +7,30 @@ Created on Wed Mar 29 11:48:21 2023
 
 import ast
 import base_class_python.DateUtility as DateUtility
+import base_class_python.MqttResponseCodec as MqttResponseCodec
 
 class MqttParser:
     """
     This class parses incoming commands, and makes shure that they are correctly formated.
+
+    Commands can be sent to commands/<variable>, or for read-only commands to commands/<variable>/read, 
+    the topic that replicas of a server share in MQTT v5 mode.
     """
+
+    read_subtopic = "read"
     
     def __init__(self, topic_origin=""):
         self._topic_origin = topic_origin
     
-    def parse_mqtt_command(self, topic, payload) -> tuple[str, str, str, list]:
+    def parse_mqtt_command(self, topic, payload, command_id_required=True) -> tuple[str, str, str, list, MqttResponseCodec.MqttResponseCodec]:
         """
-        It returns a tuple with (command_name, command_type, command_id, parameters).
+        It returns a tuple with (command_name, command_type, command_id, parameters, response_codec).
+
+        The response codec can be chosen with an optional fourth field in the payload, for example 'GET;id;[];json'.
+        If it isn't given, the text codec is used.
+
+        If command_id_required is False, as for MQTT v5 commands with correlation data, the ID can be left empty,
+        for example 'GET;;[1]', or the payload can have only the command type. Then, the returned ID is empty.
 
         Raises ValueError.
         """
@@ -26,21 +38,23 @@ class MqttParser:
         if topic.startswith(self._topic_origin + "commands"):
             
             topic_structure = topic.split('/')
+            if self.is_read_topic(topic):
+                topic_structure = topic_structure[:-1]
             command_name = topic_structure[-1]
             if command_name == "commands":
                 raise ValueError("No command specified. Use a subtopic of commands")
             
             payload_array = payload.split(';')
-            if len(payload_array) not in (2, 3):
+            if len(payload_array) not in (2, 3, 4) and not (len(payload_array) == 1 and not command_id_required):
                 raise ValueError("The command format isn't correct, to much or to few arguments")
             
             command_type = payload_array[0]
-            command_id = payload_array[1]
+            command_id = payload_array[1] if len(payload_array) > 1 else ""
 
-            if not DateUtility.check_date_string(command_id):
+            if (command_id != "" or command_id_required) and not DateUtility.check_date_string(command_id):
                 raise ValueError("The id format isn't correct, it should be ISO-8601 with microseconds")
                 
-            if len(payload_array) == 3:
+            if len(payload_array) >= 3 and payload_array[2] != "":
                 try:
                     parameters = ast.literal_eval(payload_array[2])
                 except (ValueError, NameError, SyntaxError):
@@ -49,9 +63,21 @@ class MqttParser:
                     raise ValueError("Parameters should be in list format")
             else:
                 parameters = []
+
+            if len(payload_array) == 4:
+                response_codec = MqttResponseCodec.get_codec(payload_array[3])
+            else:
+                response_codec = MqttResponseCodec.default_codec
             
-            return (command_name, command_type, command_id, parameters)
+            return (command_name, command_type, command_id, parameters, response_codec)
 
     
         else:
-            raise ValueError("The topic {} is not a command topic".format(topic))
\ No newline at end of file
+            raise ValueError("The topic {} is not a command topic".format(topic))
+
+    def is_read_topic(self, topic) -> bool:
+        """
+        Returns True for topics of the form commands/<variable>/read.
+        """
+        topic_structure = topic.split('/')
+        return len(topic_structure) >= 3 and topic_structure[-1] == self.read_subtopic and topic_structure[-2] != "commands"
\ No newline at end of file
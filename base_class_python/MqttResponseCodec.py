@@ -0,0 +1,220 @@
+import ast
+import json
+import struct
+from abc import ABCMeta, abstractmethod
+from typing import Any, Union
+
+
+class MqttResponseCodec(metaclass = ABCMeta):
+    """
+    Base class of the formats in which responses can be sent. The format is chosen by the client in each command,
+    and the same codec is used to encode the response in the server and to decode it in the client, so the values
+    of the response keep their types.
+
+    Decoded responses are tuples with the response code, the command ID and the list of response values. For NACK
+    responses the first value is always the error message.
+    """
+
+    name = ''
+
+    @abstractmethod
+    def encode_response(self, response_code: str, command_id: str, response_list: list[Any]) -> Union[str, bytes]:
+        """
+        Encodes DONE and ERROR responses.
+        """
+        pass
+
+    @abstractmethod
+    def encode_nack(self, command_id: str, message: str, topic_of_request: str, payload_of_request: str) -> Union[str, bytes]:
+        pass
+
+    @abstractmethod
+    def decode_response(self, payload: bytes) -> tuple[str, Union[str, None], list[Any]]:
+        """
+        Raises ValueError.
+        """
+        pass
+
+
+class TextResponseCodec(MqttResponseCodec):
+    """
+    The original format, 'DONE;id;[values]', with the values written as a python list. It is the default, so
+    clients that don't choose a codec keep working as before.
+    """
+
+    name = 'text'
+
+    def encode_response(self, response_code: str, command_id: str, response_list: list[Any]) -> str:
+        if response_code == 'DONE' and response_list == []:
+            return 'DONE;{}'.format(command_id)
+        return '{};{};{}'.format(response_code, command_id, str(response_list))
+
+    def encode_nack(self, command_id: str, message: str, topic_of_request: str, payload_of_request: str) -> str:
+        return 'NACK_{}_{}_{}'.format(topic_of_request, payload_of_request, message)
+
+    def decode_response(self, payload: bytes) -> tuple[str, Union[str, None], list[Any]]:
+        text_payload = payload.decode('utf-8')
+        if text_payload.startswith('NACK'):
+            # the request is embedded in the message, so the ID can't be extracted safely.
+            return ('NACK', None, [text_payload])
+
+        splited_payload = text_payload.split(';', 2)
+        if splited_payload[0] not in ('DONE', 'ERROR') or len(splited_payload) < 2:
+            raise ValueError("The response format isn't correct: {}".format(text_payload))
+        if len(splited_payload) == 2:
+            return (splited_payload[0], splited_payload[1], [])
+
+        try:
+            response_list = ast.literal_eval(splited_payload[2])
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            response_list = None
+        if type(response_list) != list:
+            # values that aren't python literals, as the ones of old servers, are returned as strings.
+            response_list = [value.strip() for value in splited_payload[2][1:-1].split(',')]
+        return (splited_payload[0], splited_payload[1], response_list)
+
+
+class JsonResponseCodec(MqttResponseCodec):
+    """
+    Responses as JSON objects, with the format version, code, ID and values. Values that can't be written in
+    JSON are sent as strings.
+    """
+
+    name = 'json'
+    version = 1
+
+    def encode_response(self, response_code: str, command_id: str, response_list: list[Any]) -> str:
+        return json.dumps({'v': self.version, 'code': response_code, 'id': command_id, 'values': response_list}, default=str)
+
+    def encode_nack(self, command_id: str, message: str, topic_of_request: str, payload_of_request: str) -> str:
+        return json.dumps({'v': self.version, 'code': 'NACK', 'id': command_id, 'values': [message, topic_of_request, payload_of_request]})
+
+    def decode_response(self, payload: bytes) -> tuple[str, Union[str, None], list[Any]]:
+        try:
+            response = json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError("The response isn't correct JSON: {}".format(e))
+        if type(response) != dict or response.get('v') != self.version:
+            raise ValueError("JSON response version not supported: {}".format(payload))
+        if not {'code', 'id', 'values'} <= response.keys():
+            raise ValueError("The JSON response have missing fields: {}".format(payload))
+        return (response['code'], response['id'], response['values'])
+
+
+class BinaryResponseCodec(MqttResponseCodec):
+    """
+    A compact binary format. After a marker byte and the format version, it has the response code, the ID and
+    the values, each value with a one byte type tag.
+    """
+
+    name = 'binary'
+    version = 1
+
+    _MARKER = 0xB1
+    _CODES = ('DONE', 'ERROR', 'NACK')
+    _HEADER = struct.Struct('<BBBI') # marker, version, code, ID length
+    _LENGTH = struct.Struct('<I')
+    _INT = struct.Struct('<q')
+    _FLOAT = struct.Struct('<d')
+
+    def encode_response(self, response_code: str, command_id: str, response_list: list[Any]) -> bytes:
+        encoded_id = command_id.encode('utf-8')
+        chunks = [self._HEADER.pack(self._MARKER, self.version, self._CODES.index(response_code), len(encoded_id)), encoded_id]
+        self._encode_value(list(response_list), chunks)
+        return b''.join(chunks)
+
+    def encode_nack(self, command_id: str, message: str, topic_of_request: str, payload_of_request: str) -> bytes:
+        return self.encode_response('NACK', command_id, [message, topic_of_request, payload_of_request])
+
+    def decode_response(self, payload: bytes) -> tuple[str, Union[str, None], list[Any]]:
+        try:
+            (marker, version, code_index, id_length) = self._HEADER.unpack_from(payload, 0)
+            if marker != self._MARKER or version != self.version:
+                raise ValueError("Binary response version not supported.")
+            offset = self._HEADER.size
+            command_id = payload[offset:offset + id_length].decode('utf-8')
+            (response_list, _) = self._decode_value(payload, offset + id_length)
+            return (self._CODES[code_index], command_id, response_list)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError("The binary response isn't correct: {}".format(e))
+
+    def _encode_value(self, value: Any, chunks: list[bytes]) -> None:
+        if value is None:
+            chunks.append(b'N')
+        elif type(value) == bool:
+            chunks.append(b'T' if value else b'F')
+        elif type(value) == int and -2**63 <= value < 2**63:
+            chunks.append(b'i' + self._INT.pack(value))
+        elif type(value) == float:
+            chunks.append(b'd' + self._FLOAT.pack(value))
+        elif type(value) in (list, tuple):
+            chunks.append(b'l' + self._LENGTH.pack(len(value)))
+            for item in value:
+                self._encode_value(item, chunks)
+        elif type(value) == bytes:
+            chunks.append(b'b' + self._LENGTH.pack(len(value)) + value)
+        else:
+            encoded_string = str(value).encode('utf-8')
+            chunks.append(b's' + self._LENGTH.pack(len(encoded_string)) + encoded_string)
+
+    def _decode_value(self, payload: bytes, offset: int) -> tuple[Any, int]:
+        """
+        Returns the value and the offset after it.
+        """
+        tag = payload[offset:offset + 1]
+        offset += 1
+        if tag == b'N':
+            return (None, offset)
+        elif tag == b'T':
+            return (True, offset)
+        elif tag == b'F':
+            return (False, offset)
+        elif tag == b'i':
+            return (self._INT.unpack_from(payload, offset)[0], offset + self._INT.size)
+        elif tag == b'd':
+            return (self._FLOAT.unpack_from(payload, offset)[0], offset + self._FLOAT.size)
+        elif tag in (b's', b'b'):
+            length = self._LENGTH.unpack_from(payload, offset)[0]
+            offset += self._LENGTH.size
+            if offset + length > len(payload):
+                raise ValueError("The binary response is truncated.")
+            data = payload[offset:offset + length]
+            return (data.decode('utf-8') if tag == b's' else data, offset + length)
+        elif tag == b'l':
+            length = self._LENGTH.unpack_from(payload, offset)[0]
+            offset += self._LENGTH.size
+            values = []
+            for _ in range(length):
+                (value, offset) = self._decode_value(payload, offset)
+                values.append(value)
+            return (values, offset)
+        else:
+            raise ValueError("Unknown value type {} in binary response.".format(tag))
+
+
+_codecs: dict[str, MqttResponseCodec] = {codec.name: codec for codec in (TextResponseCodec(), JsonResponseCodec(), BinaryResponseCodec())}
+
+default_codec = _codecs['text']
+
+
+def get_codec(codec_name: str) -> MqttResponseCodec:
+    """
+    Raises ValueError.
+    """
+    if codec_name not in _codecs:
+        raise ValueError("Response codec {} not supported. Use {}.".format(codec_name, ", ".join(_codecs.keys())))
+    return _codecs[codec_name]
+
+
+def decode_response(payload: bytes) -> tuple[str, Union[str, None], list[Any]]:
+    """
+    Decodes a response detecting in which of the codecs it is written.
+
+    Raises ValueError.
+    """
+    if payload[:1] == bytes([BinaryResponseCodec._MARKER]):
+        return _codecs['binary'].decode_response(payload)
+    elif payload[:1] == b'{':
+        return _codecs['json'].decode_response(payload)
+    else:
+        return _codecs['text'].decode_response(payload)
@@ -0,0 +1,221 @@
+import os
+import struct
+import threading
+import time
+from typing import Callable, Union
+
+
+class MqttSpool:
+    """
+    A bounded store-and-forward spool in local disk. While the connection with the broker is lost, outgoing messages
+    are appended to segment files, and when it is recovered they are replayed in batches at a limited rate. As the
+    messages are written to disk and replayed segment by segment, the memory usage doesn't depend on the outage length.
+
+    The spool is bounded to max_segments segments of segment_size bytes. When it is full, the oldest segment is discarded.
+    Messages are replayed without retain, so they don't overwrite the retained values published after the reconnection.
+    """
+
+    _RECORD_HEADER = struct.Struct('<HI?') # topic length, payload length, retain
+    _SEGMENT_PREFIX = 'spool_'
+    _SEGMENT_SUFFIX = '.seg'
+
+    def __init__(self, directory: str, segment_size: int=16 * 1024 * 1024, max_segments: int=64,
+                 replay_rate: float=1000, replay_batch_size: int=100) -> None:
+        """
+        replay_rate is the maximum number of messages per second sent while replaying, in batches of replay_batch_size messages.
+
+        Raises ValueError.
+        """
+        if segment_size <= 0 or max_segments < 2:
+            raise ValueError("Spool segment size should be positive, and there should be at least 2 segments.")
+        if replay_rate <= 0 or replay_batch_size <= 0:
+            raise ValueError("Spool replay rate and batch size should be positive.")
+
+        self._directory = directory
+        self._segment_size = segment_size
+        self._max_segments = max_segments
+        self._replay_rate = replay_rate
+        self._replay_batch_size = replay_batch_size
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._replay_thread: threading.Thread | None = None
+        self._stop_replay = threading.Event()
+
+        self._spooled_messages = 0
+        self._replayed_messages = 0
+        self._discarded_segments = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # segments left by a previous execution are kept, to be replayed in the next connection.
+        existing_segments = self._list_segments()
+        self._next_segment_number = existing_segments[-1] + 1 if len(existing_segments) > 0 else 0
+        self._write_file = None
+        self._write_segment_number = None
+        # segment number and offset up to which it have been replayed, if the replay was interrupted.
+        self._replay_position = (None, 0)
+
+
+    def append(self, topic: str, payload: Union[str, bytes], retain: bool=False) -> None:
+        """
+        Saves a message to be sent later. Messages appended after closing the spool are still saved, to be
+        replayed in the next execution.
+        """
+        encoded_topic = topic.encode('utf-8')
+        encoded_payload = payload.encode('utf-8') if type(payload) == str else payload
+        record = self._RECORD_HEADER.pack(len(encoded_topic), len(encoded_payload), retain) + encoded_topic + encoded_payload
+
+        with self._lock:
+            if self._write_file is None or self._write_file.tell() + len(record) > self._segment_size:
+                self._open_new_segment()
+            self._write_file.write(record)
+            self._spooled_messages += 1
+            if self._closed:
+                self._close_write_segment()
+
+
+    def has_messages(self) -> bool:
+        with self._lock:
+            return len(self._list_segments()) > 0
+
+
+    def start_replay(self, publish_function: Callable[[str, bytes], bool]) -> None:
+        """
+        Starts replaying the spooled messages in a background thread, if it is not already running. The publish function
+        receives the topic and payload, and should return False if the message couldn't be sent, to stop the replay and
+        keep the remaining messages for the next connection.
+
+        If a previous replay is being stopped, it waits for it to end, so it doesn't exit after the new replay is started.
+        """
+        with self._lock:
+            previous_replay_thread = self._replay_thread
+        if previous_replay_thread is not None and previous_replay_thread.is_alive():
+            if not self._stop_replay.is_set():
+                return
+            previous_replay_thread.join()
+
+        with self._lock:
+            if self._replay_thread is not None and self._replay_thread is not previous_replay_thread and self._replay_thread.is_alive():
+                return
+            # the segment being written is closed, so only closed segments are replayed.
+            self._close_write_segment()
+            self._stop_replay.clear()
+            self._replay_thread = threading.Thread(target=self._replay, args=(publish_function,), name="Spool replay", daemon=True)
+            self._replay_thread.start()
+
+
+    def stop_replay(self) -> None:
+        self._stop_replay.set()
+
+
+    def get_statistics(self) -> dict[str, int]:
+        with self._lock:
+            return {"SpooledMessages": self._spooled_messages,
+                    "ReplayedMessages": self._replayed_messages,
+                    "DiscardedSegments": self._discarded_segments,
+                    "Segments": len(self._list_segments())}
+
+
+    def close(self) -> None:
+        self.stop_replay()
+        with self._lock:
+            self._closed = True
+            self._close_write_segment()
+
+
+    def _replay(self, publish_function: Callable[[str, bytes], bool]) -> None:
+        batch_period = self._replay_batch_size / self._replay_rate
+        while not self._stop_replay.is_set():
+            with self._lock:
+                closed_segments = [number for number in self._list_segments() if number != self._write_segment_number]
+                (replayed_segment_number, replayed_offset) = self._replay_position
+                if len(closed_segments) == 0:
+                    if self._write_file is None or self._stop_replay.is_set():
+                        # a message appended after this is replayed by a new replay, as this one is already finished.
+                        self._replay_thread = None
+                        return
+                    # messages appended while the connection was being recovered are also replayed.
+                    self._close_write_segment()
+                    continue
+
+            segment_number = closed_segments[0]
+            try:
+                with open(self._segment_path(segment_number), 'rb') as segment_file:
+                    segment_file.seek(replayed_offset if replayed_segment_number == segment_number else 0)
+                    while not self._stop_replay.is_set():
+                        batch_start_time = time.time()
+                        batch = self._read_batch(segment_file)
+                        if len(batch) == 0:
+                            break
+                        for (topic, payload, offset_after_record) in batch:
+                            if not publish_function(topic, payload):
+                                return
+                            with self._lock:
+                                self._replay_position = (segment_number, offset_after_record)
+                                self._replayed_messages += 1
+                        time_to_sleep = batch_period - (time.time() - batch_start_time)
+                        if time_to_sleep > 0:
+                            self._stop_replay.wait(time_to_sleep)
+            except FileNotFoundError:
+                # the segment have been discarded because the spool was full.
+                pass
+
+            if self._stop_replay.is_set():
+                return
+
+            with self._lock:
+                self._remove_segment(segment_number)
+
+
+    def _read_batch(self, segment_file) -> list[tuple[str, bytes, int]]:
+        """
+        Reads up to a batch of records. A truncated record at the end of the segment, for example after a crash, is ignored.
+        """
+        batch = []
+        while len(batch) < self._replay_batch_size:
+            header = segment_file.read(self._RECORD_HEADER.size)
+            if len(header) < self._RECORD_HEADER.size:
+                break
+            (topic_length, payload_length, _) = self._RECORD_HEADER.unpack(header)
+            data = segment_file.read(topic_length + payload_length)
+            if len(data) < topic_length + payload_length:
+                break
+            batch.append((data[:topic_length].decode('utf-8'), data[topic_length:], segment_file.tell()))
+        return batch
+
+
+    def _open_new_segment(self) -> None:
+        self._close_write_segment()
+        segments = self._list_segments()
+        while len(segments) >= self._max_segments:
+            self._remove_segment(segments.pop(0))
+            self._discarded_segments += 1
+        self._write_segment_number = self._next_segment_number
+        self._next_segment_number += 1
+        self._write_file = open(self._segment_path(self._write_segment_number), 'ab')
+
+    def _close_write_segment(self) -> None:
+        if self._write_file is not None:
+            self._write_file.close()
+            self._write_file = None
+            self._write_segment_number = None
+
+    def _remove_segment(self, segment_number: int) -> None:
+        try:
+            os.remove(self._segment_path(segment_number))
+        except OSError:
+            # it could be already removed, or open for replay in systems that don't allow removing open files.
+            pass
+
+    def _list_segments(self) -> list[int]:
+        segment_numbers = []
+        for file_name in os.listdir(self._directory):
+            if file_name.startswith(self._SEGMENT_PREFIX) and file_name.endswith(self._SEGMENT_SUFFIX):
+                try:
+                    segment_numbers.append(int(file_name[len(self._SEGMENT_PREFIX):-len(self._SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(segment_numbers)
+
+    def _segment_path(self, segment_number: int) -> str:
+        return os.path.join(self._directory, "{}{:010d}{}".format(self._SEGMENT_PREFIX, segment_number, self._SEGMENT_SUFFIX))
@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+from array import array
+import paho.mqtt.client as client_mqtt
+
+from base_class_python import DateUtility
+
+
+class MqttStreamBatch:
+    """
+    A batch of monitor samples of one variable, in columnar format: the UNIX timestamps and the values are
+    saved in two arrays of doubles of the same length, which can be used directly as buffers, for example
+    with numpy.frombuffer.
+    """
+
+    def __init__(self, variable_name: str, timestamps: array, values: array) -> None:
+        self.variable_name = variable_name
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class MqttStreamConsumer:
+    """
+    A class to consume the monitor data of one or many variables at high rate. The samples published in the
+    data topics are accumulated in columnar buffers, and given in MqttStreamBatch batches, iterating over the
+    consumer, or asynchronously with async for.
+
+    A batch of a variable is given when it have batch_size samples, or when its oldest sample have waited
+    max_batch_delay seconds. At most max_buffered_samples are buffered; when the buffer is full, the incoming
+    samples are dropped if drop_when_full is True. If not, the reception waits up to max_full_wait seconds for 
+    the batches to be consumed, and then the sample is dropped, as the rest of samples until there is space again. 
+    Dropped samples are counted in the statistics. Only numeric values can be consumed, the rest are counted as invalid.
+
+    The data topics are subscribed with QoS 0, so the broker doesn't keep the messages while the reception waits.
+    Waiting blocks the network loop, which can't answer the broker meanwhile, so max_full_wait should be well 
+    below the keepalive of the connection, 60 seconds.
+    """
+
+    _ASYNC_WAIT_PERIOD = 0.5
+
+    def __init__(self, mqtt_broker_ip: str, variable_names: list[str],
+                 mqtt_broker_port: int=1883, topic_origin: str='',
+                 batch_size: int=1000, max_batch_delay: float=0.1, max_buffered_samples: int=100000,
+                 drop_when_full: bool=False, max_full_wait: float=5, timeout: float=10) -> None:
+        """
+        Raises ValueError and TimeoutError.
+        """
+        if batch_size <= 0 or max_buffered_samples < batch_size:
+            raise ValueError("Batch size should be positive, and the maximum buffered samples at least the batch size.")
+        if max_full_wait < 0 or max_full_wait >= 60:
+            raise ValueError("The maximum wait when the buffer is full should be between 0 and the keepalive, 60 seconds.")
+
+        self._mqtt_broker_ip = mqtt_broker_ip
+        self._mqtt_broker_port = mqtt_broker_port
+        self._topic_origin = topic_origin
+        self._timeout = timeout
+
+        self._batch_size = batch_size
+        self._max_batch_delay = max_batch_delay
+        self._max_buffered_samples = max_buffered_samples
+        self._drop_when_full = drop_when_full
+        self._max_full_wait = max_full_wait
+
+        self._topic_to_variable = {self._topic_origin + "data/{}".format(variable_name): variable_name for variable_name in variable_names}
+
+        self._condition = threading.Condition()
+        self._pending: dict[str, tuple[array, array]] = {variable_name: (array('d'), array('d')) for variable_name in variable_names}
+        # arrival time of the oldest pending sample of each variable.
+        self._pending_since: dict[str, float] = {}
+        self._buffered_samples = 0
+        # set when a wait for space have timed out, so the next samples are dropped without waiting until there is space.
+        self._overflowing = False
+        self._closed = False
+
+        self._received_samples = 0
+        self._dropped_samples = 0
+        self._invalid_samples = 0
+
+        self._create_client()
+
+
+    def __iter__(self):
+        while True:
+            batch = self.get_next_batch()
+            if batch is None:
+                return
+            yield batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> MqttStreamBatch:
+        # batches are waited in short periods, so the executor thread is released if the task is cancelled.
+        while True:
+            batch = await asyncio.get_running_loop().run_in_executor(None, self.get_next_batch, self._ASYNC_WAIT_PERIOD)
+            if batch is not None:
+                return batch
+            with self._condition:
+                if self._closed and len(self._pending_since) == 0:
+                    raise StopAsyncIteration
+
+
+    def get_next_batch(self, timeout: float | None=None) -> MqttStreamBatch | None:
+        """
+        Waits until a batch is ready and returns it. It returns None if the timeout elapses, or if the consumer have
+        been closed and all the buffered samples have been consumed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                variable_name = self._get_ready_variable()
+                if variable_name is not None:
+                    return self._pop_batch(variable_name)
+
+                if self._closed:
+                    if len(self._pending_since) == 0:
+                        return None
+                    return self._pop_batch(next(iter(self._pending_since)))
+
+                now = time.monotonic()
+                wait_time = None
+                if len(self._pending_since) > 0:
+                    wait_time = min(self._pending_since.values()) + self._max_batch_delay - now
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait_time = deadline - now if wait_time is None else min(wait_time, deadline - now)
+                self._condition.wait(wait_time)
+
+
+    def get_statistics(self) -> dict[str, int]:
+        with self._condition:
+            return {"Received": self._received_samples,
+                    "Dropped": self._dropped_samples,
+                    "Invalid": self._invalid_samples,
+                    "Buffered": self._buffered_samples}
+
+
+    def close(self) -> None:
+        """
+        Stops receiving samples. The already buffered samples can still be consumed.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+    def _on_connect(self, client, userdata, flags, rc):
+        for topic in self._topic_to_variable:
+            self._client.subscribe(topic)
+        self._connected = True
+
+
+    def _mqtt_message_handler(self, client, userdata, message):
+        variable_name = self._topic_to_variable.get(message.topic)
+        if variable_name is None:
+            return
+
+        (value_part, _, date_part) = message.payload.rpartition(b';')
+        try:
+            value = float(value_part)
+            timestamp = DateUtility.date_string_to_timestamp(date_part.decode('ascii'))
+        except (ValueError, UnicodeDecodeError):
+            with self._condition:
+                self._invalid_samples += 1
+            return
+
+        with self._condition:
+            self._received_samples += 1
+            # waiting here blocks the network loop, so it is bounded to keep the connection alive.
+            deadline = time.monotonic() + self._max_full_wait
+            while self._buffered_samples >= self._max_buffered_samples and not self._closed:
+                wait_time = deadline - time.monotonic()
+                if self._drop_when_full or self._overflowing or wait_time <= 0:
+                    self._overflowing = not self._drop_when_full
+                    self._dropped_samples += 1
+                    return
+                self._condition.wait(wait_time)
+            if self._closed:
+                return
+            self._overflowing = False
+
+            (timestamps, values) = self._pending[variable_name]
+            if len(values) == 0:
+                self._pending_since[variable_name] = time.monotonic()
+            timestamps.append(timestamp)
+            values.append(value)
+            self._buffered_samples += 1
+
+            # consumers are woken when the batch delay starts counting, and when the batch is full.
+            if len(values) == 1 or len(values) == self._batch_size:
+                self._condition.notify_all()
+
+
+    def _get_ready_variable(self) -> str | None:
+        now = time.monotonic()
+        for (variable_name, pending_since) in self._pending_since.items():
+            if len(self._pending[variable_name][1]) >= self._batch_size or now - pending_since >= self._max_batch_delay:
+                return variable_name
+        return None
+
+    def _pop_batch(self, variable_name: str) -> MqttStreamBatch:
+        (timestamps, values) = self._pending[variable_name]
+        self._pending[variable_name] = (array('d'), array('d'))
+        del self._pending_since[variable_name]
+        self._buffered_samples -= len(values)
+        # there is space again for the samples waiting in the network loop.
+        self._condition.notify_all()
+        return MqttStreamBatch(variable_name, timestamps, values)
+
+
+    def _create_client(self):
+        self._client = client_mqtt.Client()
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._mqtt_message_handler
+
+        self._connected = False
+        self._client.connect(self._mqtt_broker_ip, self._mqtt_broker_port, 60)
+        self._client.loop_start()
+        t0 = time.time()
+        while not self._connected:
+            if ((time.time() - t0) < self._timeout):
+                time.sleep(0.01)
+            else:
+                raise TimeoutError("To much time connecting to broker")
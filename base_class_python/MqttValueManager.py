@@ -1,7 +1,12 @@
 import time
+import uuid
+from typing import Any
 import paho.mqtt.client as client_mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 
 from base_class_python import DateUtility
+from base_class_python import MqttResponseCodec
 
 
 class MqttValueManager:
@@ -11,49 +16,71 @@ class MqttValueManager:
 
     To use this class, a MqttValueManager object must be created, and then the methods
     get_variable_value and set_variable_value can be used.
+
+    With mqtt_v5, GET commands are sent with MQTT v5 response topic and correlation data properties, 
+    and the responses are received in a topic of this value manager, so there is no need to subscribe 
+    to the response topic of each variable. The servers should also run in MQTT v5 mode. With shared_reads,
+    the GET commands are sent to the read-only topics, commands/<variable>/read, which are shared between 
+    the servers of a shared subscription group.
     """
     def __init__(self, mqtt_broker_ip: str, 
                  mqtt_broker_port: int=1883, topic_origin: str='',
-                 timeout: float=10) -> None:
+                 timeout: float=10, mqtt_v5: bool=False, shared_reads: bool=False) -> None:
+        """
+        Raises ValueError and TimeoutError.
+        """
+        if shared_reads and not mqtt_v5:
+            raise ValueError("Shared reads are only supported in MQTT v5 mode.")
         self._mqtt_broker_ip = mqtt_broker_ip
         self._mqtt_broker_port = mqtt_broker_port
         self._topic_origin = topic_origin
         self._timeout = timeout
 
+        self._mqtt_v5 = mqtt_v5
+        self._shared_reads = shared_reads
+        self._client_id = "value_manager_{}".format(uuid.uuid4().hex)
+        self._response_topic = self._topic_origin + "responses/_clients/{}".format(self._client_id)
+        self._last_get_correlation_data = None
+
         self.last_get_id = None
         self._received = False
         self._create_client()
         self._last_response = None
 
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if self._mqtt_v5:
+            self._client.subscribe(self._response_topic)
         self._connected = True
     
 
     def _mqtt_message_handler(self, client, userdata, message):
         try:
-            payload : str = message.payload.decode()
-            if payload.startswith("NACK"):
-                raise ValueError("The message to get the variable have not been adquired: {}".format(payload))
+            (response_code, command_id, response_list) = MqttResponseCodec.decode_response(message.payload)
+            if response_code == "NACK":
+                raise ValueError("The message to get the variable have not been adquired: {}".format(response_list[0]))
 
-            elif payload.startswith("ERROR"):
-                raise ValueError("The variable to get have returned error: {}".format(payload))
+            elif response_code == "ERROR":
+                raise ValueError("The variable to get have returned error: {}".format(response_list))
 
-            elif payload.startswith("DONE"):
-                splited_payload = payload.split(";")
-                if splited_payload[1] != self.last_get_id:
+            elif response_code == "DONE":
+                if self._mqtt_v5:
+                    is_last_get_response = getattr(message.properties, 'CorrelationData', None) == self._last_get_correlation_data
+                else:
+                    is_last_get_response = command_id == self.last_get_id
+                if not is_last_get_response:
                     pass
                 else:
-                    if len(splited_payload) != 3:
-                        raise ValueError("The response have the incorrect number of arguments: {}".format(payload))
+                    if response_list == []:
+                        raise ValueError("The response have the incorrect number of arguments: {}".format(message.payload))
 
-                    self._last_response = (splited_payload[0], splited_payload[2][1:-1].split(","))
+                    self._last_response = (response_code, response_list)
                     self._received = True
         except ValueError as e:
             print(e)
 
 
     def _create_client(self):
-        self._client = client_mqtt.Client()
+        self._client = client_mqtt.Client(client_id=self._client_id, protocol=client_mqtt.MQTTv5 if self._mqtt_v5 else client_mqtt.MQTTv311)
         self._client.on_connect = self._on_connect
         self._client.on_message = self._mqtt_message_handler
 
@@ -68,23 +95,33 @@ class MqttValueManager:
                 raise TimeoutError("To much time connecting to broker")
 
 
-    def get_variable_value(self, variable_name: str, timeout: float=1) -> tuple[str, list[str]]:
+    def get_variable_value(self, variable_name: str, timeout: float=1, response_codec: str='text') -> tuple[str, list[Any]]:
         """
         Get the value of a MQTT variable. Return a tuple with the response code, and argument list.
 
         Internally, the value manager creates a subscription to the response topic of the variable, sends
         a GET command, and waits for it to be ansered. Then, breaks the subscription.
 
-        Raises TimeuotError and others.
+        The response_codec selects the format of the response, 'text', 'json' or 'binary'. The values of
+        the argument list keep their types in all of them, but servers older than the response codecs only 
+        support 'text'.
+
+        Raises TimeuotError, ValueError and others.
         """
         t_start = time.time()
+        MqttResponseCodec.get_codec(response_codec)
+        if self._mqtt_v5:
+            return self._get_variable_value_v5(variable_name, timeout, response_codec)
         topic_to_subscribe = self._topic_origin + "responses/{}".format(variable_name)
         self._received = False
         self._client.subscribe(topic=topic_to_subscribe)
         
         topic = self._topic_origin + "commands/{}".format(variable_name)
         self.last_get_id = DateUtility.get_date_string()
-        payload = "GET;{}".format(self.last_get_id)
+        if response_codec == MqttResponseCodec.default_codec.name:
+            payload = "GET;{}".format(self.last_get_id)
+        else:
+            payload = "GET;{};[];{}".format(self.last_get_id, response_codec)
         self._client.publish(topic, payload)
 
         t0 = time.time()
@@ -98,6 +135,33 @@ class MqttValueManager:
         raise TimeoutError("Timeout at getting variable {}, more than {} seconds elapsed".format(variable_name, timeout))
     
 
+    def _get_variable_value_v5(self, variable_name: str, timeout: float, response_codec: str) -> tuple[str, list[Any]]:
+        """
+        The command ID is left empty, as the response is identified by its correlation data.
+        """
+        self._received = False
+        self._last_get_correlation_data = uuid.uuid4().bytes
+
+        properties = Properties(PacketTypes.PUBLISH)
+        properties.ResponseTopic = self._response_topic
+        properties.CorrelationData = self._last_get_correlation_data
+
+        topic = self._topic_origin + "commands/{}".format(variable_name)
+        if self._shared_reads:
+            topic += "/read"
+        if response_codec == MqttResponseCodec.default_codec.name:
+            payload = "GET"
+        else:
+            payload = "GET;;[];{}".format(response_codec)
+        self._client.publish(topic, payload, properties=properties)
+
+        t0 = time.time()
+        while ((time.time() - t0) < timeout):
+            if self._received:
+                return self._last_response
+        raise TimeoutError("Timeout at getting variable {}, more than {} seconds elapsed".format(variable_name, timeout))
+
+
     def set_variable_value(self, variable_name: str, new_value: str) -> bool:
         """
         Set the value of a MQTT variable. Return true if message is sended, false if not, but 
@@ -0,0 +1,85 @@
+import math
+
+
+class StreamingStatistics:
+    """
+    Accumulates statistics of a stream of values in constant memory. It is used by the aggregate monitor mode,
+    to publish a summary of many fast samples.
+
+    Values that aren't numeric can be counted with add_invalid, and their count is given in the summary as
+    'invalid', only if there have been any.
+    """
+
+    supported_statistics = ('min', 'max', 'mean', 'count', 'std', 'first', 'last')
+    default_statistics = ('min', 'max', 'mean', 'count')
+
+    def __init__(self, statistics: list[str] | None=None) -> None:
+        """
+        Raises ValueError.
+        """
+        if statistics is None:
+            statistics = list(self.default_statistics)
+
+        if len(statistics) == 0:
+            raise ValueError("At least one statistic should be selected.")
+        for statistic in statistics:
+            if statistic not in self.supported_statistics:
+                raise ValueError("Statistic {} not supported. Use only {}.".format(statistic, ", ".join(self.supported_statistics)))
+
+        self._statistics = list(statistics)
+        self.reset()
+
+
+    def add(self, value: float) -> None:
+        self._count += 1
+        if self._count == 1:
+            self._min = value
+            self._max = value
+            self._first = value
+        else:
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+        self._last = value
+
+        # Welford's algorithm, to compute mean and variance without saving the values.
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._sum_of_squares += delta * (value - self._mean)
+
+
+    def add_invalid(self) -> None:
+        self._invalid_count += 1
+
+
+    def get_summary(self) -> dict[str, float | int | None]:
+        """
+        Returns a dict with the selected statistics. If no value have been added, all but count are None.
+        """
+        all_statistics = {'count': self._count,
+                          'min': self._min,
+                          'max': self._max,
+                          'mean': self._mean if self._count > 0 else None,
+                          'std': math.sqrt(self._sum_of_squares / self._count) if self._count > 0 else None,
+                          'first': self._first,
+                          'last': self._last}
+        summary = {statistic: all_statistics[statistic] for statistic in self._statistics}
+        if self._invalid_count > 0:
+            summary['invalid'] = self._invalid_count
+        return summary
+
+    def get_invalid_count(self) -> int:
+        return self._invalid_count
+
+
+    def reset(self) -> None:
+        self._count = 0
+        self._min = None
+        self._max = None
+        self._mean = 0.0
+        self._sum_of_squares = 0.0
+        self._first = None
+        self._last = None
+        self._invalid_count = 0
+
+    def get_statistics(self) -> list[str]:
+        return list(self._statistics)
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import paho.mqtt.client as client_mqtt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_mqtt import FakeBroker, FakeClient
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """
+    A fake broker, to which all the paho clients created during the test are connected.
+    """
+    fake_broker = FakeBroker()
+    monkeypatch.setattr(client_mqtt, "Client", lambda *args, **kwargs: FakeClient(fake_broker, *args, **kwargs))
+    return fake_broker
+
+
+@pytest.fixture
+def servers():
+    """
+    A list where the tests add the servers they create, to close their connections and threads at the end.
+    """
+    created_servers = []
+    yield created_servers
+    for server in created_servers:
+        server._connection.close_connection()
+        for group_monitor_thread in server._group_monitor_thread_list:
+            group_monitor_thread.stop_thread()
+        for monitor_thread in server._monitor_thread_list:
+            monitor_thread.stop_thread()
@@ -0,0 +1,49 @@
+from base_class_python.MqttHardwareVariable import MqttHardwareVariable
+
+
+class CountingVariable(MqttHardwareVariable):
+    """
+    A variable that counts the commands it handles. Its monitor measurement is its value.
+    """
+
+    def __init__(self, name: str, value=0.0, info: dict[str, str] | None=None, history_size: int=0) -> None:
+        self._name = name
+        self.value = value
+        self.info = info or {}
+        self._history_size = history_size
+        self.get_commands = 0
+        self.put_commands = 0
+        self.info_commands = 0
+        self.measurements = 0
+
+    def get_put_argument_number(self):
+        return [1]
+
+    def handle_put_command(self, argument_list):
+        self.put_commands += 1
+        self.value = argument_list[0]
+        return ("DONE", [])
+
+    def handle_get_command(self):
+        self.get_commands += 1
+        return ("DONE", [self.value])
+
+    def handle_start_monitor_request_command(self, mode, period):
+        return True
+
+    def handle_info_command(self):
+        self.info_commands += 1
+        return dict(self.info)
+
+    def get_measurement_for_monitor(self, delta_time):
+        self.measurements += 1
+        return self.value
+
+    def get_variable_name(self):
+        return self._name
+
+    def get_history_size(self):
+        return self._history_size
+
+    def stop_variable(self):
+        pass
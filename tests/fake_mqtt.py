@@ -0,0 +1,162 @@
+import threading
+from types import SimpleNamespace
+
+import paho.mqtt.client as client_mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+
+class FakeBroker:
+    """
+    An in-process stand-in of a MQTT v5 broker. Messages are delivered synchronously, in the thread of the
+    publisher, to the clients subscribed to the exact topic. Each message of a $share/<group>/<topic> subscription
+    is delivered to only one client of the group, in round robin.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._clients: list["FakeClient"] = []
+        self._share_counters: dict[tuple[str, str], int] = {}
+        self.published: list[SimpleNamespace] = []
+
+    def register(self, client: "FakeClient") -> None:
+        with self._lock:
+            self._clients.append(client)
+
+    def publish(self, topic: str, payload, properties) -> None:
+        if payload is None:
+            payload = b''
+        elif type(payload) == str:
+            payload = payload.encode('utf-8')
+        message = SimpleNamespace(topic=topic, payload=payload, properties=properties)
+
+        with self._lock:
+            self.published.append(message)
+            receivers = [client for client in self._clients if client.connected and topic in client.subscriptions]
+            group_members: dict[str, list[FakeClient]] = {}
+            for client in self._clients:
+                for subscription in client.subscriptions:
+                    if client.connected and subscription.startswith("$share/"):
+                        (_, group, shared_topic) = subscription.split('/', 2)
+                        if shared_topic == topic:
+                            group_members.setdefault(group, []).append(client)
+            for (group, members) in group_members.items():
+                counter = self._share_counters.get((group, topic), 0)
+                self._share_counters[(group, topic)] = counter + 1
+                receivers.append(members[counter % len(members)])
+
+        for client in receivers:
+            client.deliver(message)
+
+    def get_published(self, topic: str) -> list[SimpleNamespace]:
+        with self._lock:
+            return [message for message in self.published if message.topic == topic]
+
+
+class FakeClient:
+    """
+    Replaces paho.mqtt.client.Client, connected to a FakeBroker.
+    """
+
+    def __init__(self, broker: FakeBroker, client_id: str="", protocol=client_mqtt.MQTTv311, **kwargs) -> None:
+        self._broker = broker
+        self._client_id = client_id
+        self._protocol = protocol
+        self._loop_stopped = threading.Event()
+
+        self.subscriptions: set[str] = set()
+        self.connected = False
+
+        self.on_connect = None
+        self.on_message = None
+        self.on_disconnect = None
+        self.on_connect_fail = None
+
+        broker.register(self)
+
+    def username_pw_set(self, username, password=None) -> None:
+        pass
+
+    def connect(self, host, port=1883, keepalive=60, *args, **kwargs) -> int:
+        self.connected = True
+        if self.on_connect is not None:
+            if self._protocol == client_mqtt.MQTTv5:
+                self.on_connect(self, None, {}, 0, None)
+            else:
+                self.on_connect(self, None, {}, 0)
+        return client_mqtt.MQTT_ERR_SUCCESS
+
+    def disconnect(self, *args, **kwargs) -> int:
+        self.connected = False
+        self._loop_stopped.set()
+        return client_mqtt.MQTT_ERR_SUCCESS
+
+    def loop_start(self) -> None:
+        pass
+
+    def loop_forever(self, *args, **kwargs) -> None:
+        self._loop_stopped.wait()
+
+    def loop_stop(self, *args, **kwargs) -> None:
+        self._loop_stopped.set()
+
+    def subscribe(self, topic, qos=0, *args, **kwargs) -> tuple[int, int]:
+        self.subscriptions.add(topic)
+        return (client_mqtt.MQTT_ERR_SUCCESS, 0)
+
+    def unsubscribe(self, topic, *args, **kwargs) -> tuple[int, int]:
+        self.subscriptions.discard(topic)
+        return (client_mqtt.MQTT_ERR_SUCCESS, 0)
+
+    def publish(self, topic, payload=None, qos=0, retain=False, properties=None) -> client_mqtt.MQTTMessageInfo:
+        info = client_mqtt.MQTTMessageInfo(0)
+        if not self.connected:
+            info.rc = client_mqtt.MQTT_ERR_NO_CONN
+            return info
+        if self._protocol != client_mqtt.MQTTv5:
+            properties = None
+        self._broker.publish(topic, payload, properties)
+        info._set_as_published()
+        return info
+
+    def deliver(self, message: SimpleNamespace) -> None:
+        if self.on_message is not None:
+            self.on_message(self, None, message)
+
+
+def publish_command(broker: FakeBroker, topic: str, payload: str, response_topic: str | None=None, correlation_data: bytes | None=None) -> None:
+    """
+    Publishes a message from a new MQTT v5 client, with the given response topic and correlation data properties.
+    """
+    client = FakeClient(broker, protocol=client_mqtt.MQTTv5)
+    client.connect("broker")
+    properties = Properties(PacketTypes.PUBLISH)
+    if response_topic is not None:
+        properties.ResponseTopic = response_topic
+    if correlation_data is not None:
+        properties.CorrelationData = correlation_data
+    client.publish(topic, payload, properties=properties)
+
+
+class RecordingConnection:
+    """
+    Replaces MqttConnection, recording the sent messages.
+    """
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[str, str]] = []
+
+    def send_single_mqtt_message(self, topic, payload, qos=0, retain=False, properties=None, spool_when_disconnected=False):
+        self.messages.append((topic, payload))
+
+
+class RecordingLogger:
+    """
+    Replaces MqttLogger, recording the logged messages.
+    """
+
+    def __init__(self) -> None:
+        self.logs: list[str] = []
+
+    def log(self, message, sender_name, priority=None):
+        self.logs.append(message)
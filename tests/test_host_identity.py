@@ -0,0 +1,117 @@
+import json
+import socket
+
+import pytest
+
+from base_class_python.MqttHardwareServer import MqttHardwareServer
+import base_class_python.DateUtility as DateUtility
+import base_class_python.HostIdentity as HostIdentity
+import base_class_python.MqttResponseCodec as MqttResponseCodec
+
+from fake_hardware import CountingVariable
+from fake_mqtt import publish_command
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """
+    Replaces the DNS resolution of HostIdentity. Setting ip to None makes the resolution fail.
+    """
+    class Resolver:
+        ip = "10.0.0.1"
+
+        def gethostbyname_ex(self, hostname):
+            if self.ip is None:
+                raise socket.gaierror("resolution failed")
+            return (hostname, [], [self.ip])
+
+    fake_resolver = Resolver()
+    monkeypatch.setattr(HostIdentity.socket, "getfqdn", lambda: "host.example")
+    monkeypatch.setattr(HostIdentity.socket, "gethostbyname_ex", fake_resolver.gethostbyname_ex)
+    # the shared identity is created again, with the fake resolution.
+    monkeypatch.setattr(HostIdentity, "_host_identity", None)
+    return fake_resolver
+
+
+def test_refresh_keeps_previous_values_when_resolution_fails(resolver):
+    host_identity = HostIdentity.HostIdentity(refresh_period=3600)
+    assert (host_identity.get_hostname(), host_identity.get_ip()) == ("host.example", "10.0.0.1")
+
+    resolver.ip = None
+    host_identity.refresh()
+    assert host_identity.get_ip() == "10.0.0.1"
+
+    resolver.ip = "10.0.0.2"
+    host_identity.refresh()
+    assert host_identity.get_ip() == "10.0.0.2"
+    host_identity.stop()
+
+
+def test_unresolved_ip_is_none(resolver):
+    resolver.ip = None
+    host_identity = HostIdentity.HostIdentity(refresh_period=3600)
+
+    assert host_identity.get_ip() is None
+    host_identity.stop()
+
+
+def test_stop_ends_the_refresh_thread(resolver):
+    host_identity = HostIdentity.HostIdentity(refresh_period=3600)
+    host_identity.stop()
+
+    assert not host_identity._refresh_thread.is_alive()
+    assert not host_identity.is_running()
+
+
+def test_shared_identity_is_created_again_after_stop(resolver):
+    host_identity = HostIdentity.get_host_identity()
+    assert HostIdentity.get_host_identity() is host_identity
+
+    host_identity.stop()
+    assert HostIdentity.get_host_identity() is not host_identity
+    assert HostIdentity.get_host_identity().is_running()
+
+
+def get_info(broker, variable_name):
+    publish_command(broker, "commands/{}".format(variable_name), "INFO;{}".format(DateUtility.get_date_string()))
+    (response_code, _, response_list) = MqttResponseCodec.decode_response(broker.get_published("responses/{}".format(variable_name))[-1].payload)
+    assert response_code == "DONE"
+    return json.loads(response_list[0])
+
+
+def test_info_is_cached_until_it_changes(broker, servers, resolver):
+    variable = CountingVariable("x", info={"Unit": "V"})
+    server = MqttHardwareServer("server", [variable], "broker")
+    servers.append(server)
+
+    assert get_info(broker, "x")["Unit"] == "V"
+    variable.info = {"Unit": "mV"}
+    assert get_info(broker, "x")["Unit"] == "V"
+    assert variable.info_commands == 1
+
+    variable.signal_info_changed()
+    assert get_info(broker, "x")["Unit"] == "mV"
+    assert variable.info_commands == 2
+
+
+def test_info_is_built_again_when_the_ip_changes(broker, servers, resolver):
+    variable = CountingVariable("x")
+    server = MqttHardwareServer("server", [variable], "broker")
+    servers.append(server)
+
+    assert get_info(broker, "x")["HostIp"] == "10.0.0.1"
+
+    resolver.ip = "10.0.0.2"
+    server._host_identity.refresh()
+    assert get_info(broker, "x")["HostIp"] == "10.0.0.2"
+    assert variable.info_commands == 2
+
+
+def test_close_program_stops_the_host_identity(broker, servers, resolver):
+    server = MqttHardwareServer("server", [CountingVariable("x")], "broker")
+    servers.append(server)
+
+    with pytest.raises(SystemExit):
+        server.close_program(0)
+
+    assert not server._host_identity.is_running()
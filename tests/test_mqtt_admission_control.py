@@ -0,0 +1,122 @@
+import pytest
+
+from base_class_python.MqttAdmissionControl import MqttAdmissionControl, TokenBucket
+from base_class_python.MqttHardwareServer import MqttHardwareServer
+import base_class_python.DateUtility as DateUtility
+import base_class_python.MqttResponseCodec as MqttResponseCodec
+
+from fake_hardware import CountingVariable
+from fake_mqtt import publish_command
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr("base_class_python.MqttAdmissionControl.time.monotonic", fake_clock)
+    return fake_clock
+
+
+def test_token_bucket_burst_and_refill(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    for _ in range(3):
+        assert bucket.has_token()
+        bucket.take_token()
+    assert not bucket.has_token()
+
+    clock.now += 0.5
+    assert bucket.has_token()
+    bucket.take_token()
+    assert not bucket.has_token()
+
+    # the bucket is never refilled over its burst.
+    clock.now += 100
+    for _ in range(3):
+        assert bucket.has_token()
+        bucket.take_token()
+    assert not bucket.has_token()
+
+
+def test_token_bucket_configuration_errors():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0)
+    with pytest.raises(ValueError):
+        MqttAdmissionControl(default_variable_rate=(1, 0))
+
+
+def test_variable_rates(clock):
+    admission_control = MqttAdmissionControl(default_variable_rate=(1, 2), variable_rates={"fast": (1, 5)})
+
+    assert [admission_control.admit_command("slow", "GET")[0] for _ in range(3)] == [True, True, False]
+    assert [admission_control.admit_command("fast", "GET")[0] for _ in range(6)] == [True] * 5 + [False]
+    # each variable has its own bucket.
+    assert admission_control.admit_command("other", "GET")[0]
+
+
+def test_priority_commands_bypass_the_limits(clock):
+    admission_control = MqttAdmissionControl(default_variable_rate=(1, 1), priority_commands=(('*', 'MONITOR'), ('valve', 'PUT')))
+
+    assert admission_control.admit_command("valve", "GET")[0]
+    assert not admission_control.admit_command("valve", "GET")[0]
+    assert admission_control.admit_command("valve", "MONITOR")[0]
+    assert admission_control.admit_command("valve", "PUT")[0]
+    assert admission_control.admit_command("pump", "GET")[0]
+    assert admission_control.get_statistics()["AdmittedWithPriority"] == 2
+
+
+def test_rejection_does_not_consume_the_other_bucket(clock):
+    admission_control = MqttAdmissionControl(default_variable_rate=(1, 1), command_type_rates={"GET": (1, 2)})
+
+    assert admission_control.admit_command("a", "GET")[0]
+    # rejected by the variable bucket, so the GET bucket keeps its token.
+    (admitted, reason) = admission_control.admit_command("a", "GET")
+    assert not admitted and "variable a" in reason
+    assert admission_control.admit_command("b", "GET")[0]
+
+    # rejected by the GET bucket, so the variable bucket keeps its token.
+    (admitted, reason) = admission_control.admit_command("c", "GET")
+    assert not admitted and "GET" in reason
+    assert admission_control.admit_command("c", "PUT")[0]
+
+
+def test_statistics(clock):
+    admission_control = MqttAdmissionControl(default_variable_rate=(1, 1), command_type_rates={"PUT": (1, 1)})
+
+    admission_control.admit_command("a", "GET")
+    admission_control.admit_command("a", "GET")
+    admission_control.admit_command("a", "MONITOR")
+    admission_control.admit_command("b", "PUT")
+    admission_control.admit_command("c", "PUT")
+
+    assert admission_control.get_statistics() == {"Admitted": 3,
+                                                  "AdmittedWithPriority": 1,
+                                                  "Rejected": 2,
+                                                  "RejectedByVariable": {"a": 1, "c": 1},
+                                                  "RejectedByCommandType": {"GET": 1, "PUT": 1}}
+
+
+def test_rejected_commands_are_not_executed_nor_logged(broker, servers, capsys):
+    variable = CountingVariable("temperature", 21.5)
+    servers.append(MqttHardwareServer("server", [variable], "broker", admission_control=MqttAdmissionControl(default_variable_rate=(0.001, 5))))
+    capsys.readouterr()
+    logs_before = len(broker.get_published("log/server"))
+
+    for _ in range(100):
+        publish_command(broker, "commands/temperature", "GET;{}".format(DateUtility.get_date_string()))
+
+    assert variable.get_commands == 5
+    response_codes = [MqttResponseCodec.decode_response(response.payload)[0] for response in broker.get_published("responses/temperature")]
+    assert (response_codes.count("DONE"), response_codes.count("ERROR")) == (5, 95)
+    assert len(broker.get_published("log/server")) - logs_before == 5
+    assert len(capsys.readouterr().out.splitlines()) == 5
+    assert servers[0].get_admission_statistics()["Rejected"] == 95
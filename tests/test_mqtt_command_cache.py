@@ -0,0 +1,109 @@
+import pytest
+
+from base_class_python.MqttCommandCache import MqttCommandCache
+from base_class_python.MqttHardwareServer import MqttHardwareServer
+import base_class_python.DateUtility as DateUtility
+
+from fake_hardware import CountingVariable
+from fake_mqtt import publish_command
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr("base_class_python.MqttCommandCache.time.monotonic", fake_clock)
+    return fake_clock
+
+
+def test_redelivery_is_answered_from_cache(clock):
+    cache = MqttCommandCache(max_size=10)
+    cache.save_response("x", "PUT", "id", "PUT;id;[1]", ("DONE", []))
+
+    assert cache.get_response("x", "PUT", "id", "PUT;id;[1]") == ("DONE", [])
+    assert cache.get_statistics() == {"Hits": 1, "Misses": 0, "Size": 1}
+
+
+def test_different_payload_with_the_same_id_is_a_miss(clock):
+    cache = MqttCommandCache(max_size=10)
+    cache.save_response("x", "PUT", "id", "PUT;id;[1]", ("DONE", []))
+
+    assert cache.get_response("x", "PUT", "id", "PUT;id;[2]") is None
+    assert cache.get_response("y", "PUT", "id", "PUT;id;[1]") is None
+    assert cache.get_statistics()["Misses"] == 2
+
+
+def test_entries_expire(clock):
+    cache = MqttCommandCache(max_size=10, time_to_live=5)
+    cache.save_response("x", "GET", "a", "GET;a", ("DONE", [1]))
+    clock.now += 3
+    cache.save_response("x", "GET", "b", "GET;b", ("DONE", [2]))
+
+    clock.now += 2.5
+    assert cache.get_response("x", "GET", "a", "GET;a") is None
+    assert cache.get_response("x", "GET", "b", "GET;b") == ("DONE", [2])
+    assert cache.get_statistics()["Size"] == 1
+
+
+def test_oldest_entries_are_evicted(clock):
+    cache = MqttCommandCache(max_size=3)
+    for i in range(5):
+        cache.save_response("x", "GET", str(i), "GET;{}".format(i), ("DONE", [i]))
+
+    assert [cache.get_response("x", "GET", str(i), "GET;{}".format(i)) for i in range(5)] == [None, None, ("DONE", [2]), ("DONE", [3]), ("DONE", [4])]
+    assert cache.get_statistics()["Size"] == 3
+
+
+def test_cache_is_disabled_by_default_size(clock):
+    cache = MqttCommandCache(max_size=0)
+    cache.save_response("x", "PUT", "id", "PUT;id;[1]", ("DONE", []))
+
+    assert cache.get_response("x", "PUT", "id", "PUT;id;[1]") is None
+    assert cache.get_statistics() == {"Hits": 0, "Misses": 0, "Size": 0}
+
+
+def test_cached_response_is_a_copy(clock):
+    cache = MqttCommandCache(max_size=10)
+    response_list = [1]
+    cache.save_response("x", "GET", "id", "GET;id", ("DONE", response_list))
+    response_list.append(2)
+
+    assert cache.get_response("x", "GET", "id", "GET;id") == ("DONE", [1])
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        MqttCommandCache(max_size=-1)
+    with pytest.raises(ValueError):
+        MqttCommandCache(time_to_live=0)
+
+
+def test_server_cache_is_disabled_by_default(broker, servers):
+    variable = CountingVariable("x", 1.0)
+    servers.append(MqttHardwareServer("server", [variable], "broker"))
+    payload = "PUT;{};[2]".format(DateUtility.get_date_string())
+
+    publish_command(broker, "commands/x", payload)
+    publish_command(broker, "commands/x", payload)
+
+    assert variable.put_commands == 2
+    assert servers[0].get_command_cache_statistics() == {"Hits": 0, "Misses": 0, "Size": 0}
+
+
+def test_server_answers_redeliveries_from_cache(broker, servers):
+    variable = CountingVariable("x", 1.0)
+    servers.append(MqttHardwareServer("server", [variable], "broker", command_cache_size=10))
+    payload = "PUT;{};[2]".format(DateUtility.get_date_string())
+
+    publish_command(broker, "commands/x", payload)
+    publish_command(broker, "commands/x", payload)
+
+    assert variable.put_commands == 1
+    assert len(broker.get_published("responses/x")) == 2
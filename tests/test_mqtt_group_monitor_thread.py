@@ -0,0 +1,105 @@
+import pytest
+
+from base_class_python.MqttGroupMonitorThread import MqttGroupMonitorThread
+from base_class_python.MqttHardwareVariableGroup import MqttHardwareVariableGroup
+from base_class_python.MqttMonitorThread import MqttMonitorThread
+from base_class_python.MonitorType import MonitorType
+import base_class_python.DateUtility as DateUtility
+
+from fake_hardware import CountingVariable
+from fake_mqtt import RecordingConnection, RecordingLogger
+
+
+class CountingGroup(MqttHardwareVariableGroup):
+    """
+    A group that records which variables are read together.
+    """
+
+    def __init__(self, variables: list[CountingVariable]) -> None:
+        self._variables = variables
+        self.reads: list[list[str]] = []
+
+    def get_group_name(self):
+        return "group"
+
+    def get_group_variables(self):
+        return self._variables
+
+    def get_measurements_for_monitor(self, delta_time, variable_names):
+        self.reads.append(list(variable_names))
+        return {variable.get_variable_name(): variable.value for variable in self._variables}
+
+    def stop_group(self):
+        pass
+
+
+class FakeTime:
+    """
+    Replaces the time module in the group thread. Sleeping advances the clock, and the thread is stopped at end_time.
+    """
+
+    def __init__(self, end_time: float) -> None:
+        self.now = 1000.0
+        self.end_time = end_time
+        self.sleeps: list[float] = []
+        self.thread = None
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+        if self.now >= self.end_time:
+            self.thread.stop_thread()
+
+
+def run_group(monkeypatch, periods: dict[str, float | None], duration: float):
+    variables = [CountingVariable(name, value=i) for (i, name) in enumerate(periods)]
+    group = CountingGroup(variables)
+    connection = RecordingConnection()
+    logger = RecordingLogger()
+    monitor_threads = {variable.get_variable_name(): MqttMonitorThread(variable, connection, logger) for variable in variables}
+    for (name, period) in periods.items():
+        monitor_threads[name].start_monitor(MonitorType.periodic, period)
+
+    fake_time = FakeTime(1000.0 + duration)
+    monkeypatch.setattr("base_class_python.MqttGroupMonitorThread.time", fake_time)
+    group_thread = MqttGroupMonitorThread(group, list(monitor_threads.values()), logger)
+    fake_time.thread = group_thread
+    group_thread.run()
+    return (group, connection, logger, fake_time)
+
+
+def get_published(connection, name):
+    return [payload for (topic, payload) in connection.messages if topic == "data/{}".format(name)]
+
+
+def test_each_variable_keeps_its_period(monkeypatch):
+    (group, connection, logger, _) = run_group(monkeypatch, {"fast": 0.05, "slow": 0.12}, duration=0.59)
+
+    # samples at 0, 0.05, ..., 0.55 and at 0, 0.12, ..., 0.48.
+    assert len(get_published(connection, "fast")) == 12
+    assert len(get_published(connection, "slow")) == 5
+    assert logger.logs == []
+
+
+def test_variables_due_together_are_read_together_with_the_same_timestamp(monkeypatch):
+    (group, connection, _, _) = run_group(monkeypatch, {"a": 0.1, "b": 0.2, "c": 0.2}, duration=0.39)
+
+    assert group.reads == [["a", "b", "c"], ["a"], ["a", "b", "c"], ["a"]]
+    a_dates = [payload.split(';')[1] for payload in get_published(connection, "a")]
+    b_dates = [payload.split(';')[1] for payload in get_published(connection, "b")]
+    c_payloads = get_published(connection, "c")
+    assert b_dates == [a_dates[0], a_dates[2]]
+    assert [payload.split(';')[1] for payload in c_payloads] == b_dates
+    assert [payload.split(';')[0] for payload in c_payloads] == ["2", "2"]
+    assert DateUtility.date_string_to_timestamp(a_dates[1]) == pytest.approx(1000.1, abs=1e-5)
+
+
+def test_variables_without_period_do_not_spin(monkeypatch):
+    (group, _, logger, fake_time) = run_group(monkeypatch, {"a": None, "b": None}, duration=0.1)
+
+    assert all(sleep == pytest.approx(MqttGroupMonitorThread._minimum_period) for sleep in fake_time.sleeps)
+    assert len(group.reads) == pytest.approx(10, abs=1)
+    assert logger.logs == []
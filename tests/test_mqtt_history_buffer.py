@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from base_class_python.MqttHistoryBuffer import MqttHistoryBuffer
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    return str(tmp_path / "history" / "x.hist")
+
+
+def test_wrap_around_keeps_the_newest_samples(file_path):
+    buffer = MqttHistoryBuffer(file_path, 5)
+    for i in range(12):
+        assert buffer.append(1000.0 + i, float(i))
+
+    assert buffer.get_sample_count() == 5
+    assert buffer.get_range(float('-inf'), float('inf')) == [(1000.0 + i, float(i)) for i in range(7, 12)]
+    assert buffer.get_range(1008.0, 1010.0) == [(1008.0, 8.0), (1009.0, 9.0), (1010.0, 10.0)]
+    assert buffer.get_range(1000.0, 1006.5) == []
+    buffer.close()
+
+
+def test_history_is_kept_after_reopening(file_path):
+    buffer = MqttHistoryBuffer(file_path, 5)
+    for i in range(7):
+        buffer.append(1000.0 + i, float(i))
+    buffer.close()
+
+    buffer = MqttHistoryBuffer(file_path, 5)
+    assert buffer.get_range(float('-inf'), float('inf')) == [(1000.0 + i, float(i)) for i in range(2, 7)]
+    # the newest timestamp is also restored.
+    assert not buffer.append(1005.0, 0.0)
+    assert buffer.append(1007.0, 7.0)
+    assert buffer.get_range(1006.0, float('inf')) == [(1006.0, 6.0), (1007.0, 7.0)]
+    buffer.close()
+
+
+def test_capacity_change_starts_a_new_history(file_path):
+    buffer = MqttHistoryBuffer(file_path, 5)
+    for i in range(5):
+        buffer.append(1000.0 + i, float(i))
+    buffer.close()
+
+    buffer = MqttHistoryBuffer(file_path, 8)
+    assert buffer.get_sample_count() == 0
+    assert os.path.getsize(file_path) == MqttHistoryBuffer._HEADER.size + 8 * MqttHistoryBuffer._SAMPLE.size
+    assert buffer.append(900.0, 1.0)
+    buffer.close()
+
+
+def test_corrupted_file_starts_a_new_history(file_path):
+    buffer = MqttHistoryBuffer(file_path, 5)
+    buffer.append(1000.0, 1.0)
+    buffer.close()
+    with open(file_path, 'r+b') as history_file:
+        history_file.write(b'XXXX')
+
+    buffer = MqttHistoryBuffer(file_path, 5)
+    assert buffer.get_sample_count() == 0
+    buffer.close()
+
+
+def test_decimation(file_path):
+    buffer = MqttHistoryBuffer(file_path, 100)
+    for i in range(100):
+        buffer.append(1000.0 + i, float(i))
+
+    samples = buffer.get_range(1000.0, 1099.0, max_samples=10)
+    assert [value for (_, value) in samples] == [float(i) for i in range(0, 100, 10)]
+    samples = buffer.get_range(1000.0, 1099.0, max_samples=30)
+    assert len(samples) <= 30 and samples[0] == (1000.0, 0.0)
+    assert len(buffer.get_range(1000.0, 1004.0, max_samples=10)) == 5
+    with pytest.raises(ValueError):
+        buffer.get_range(1000.0, 1099.0, max_samples=0)
+    buffer.close()
+
+
+def test_small_clock_jumps_are_discarded(file_path):
+    buffer = MqttHistoryBuffer(file_path, 10, clock_jump_threshold=60)
+    buffer.append(1000.0, 1.0)
+
+    assert not buffer.append(990.0, 2.0)
+    assert buffer.get_discarded_count() == 1
+    assert buffer.append(1000.5, 3.0)
+    assert buffer.get_range(float('-inf'), float('inf')) == [(1000.0, 1.0), (1000.5, 3.0)]
+    buffer.close()
+
+
+def test_large_clock_jumps_clear_the_history(file_path):
+    buffer = MqttHistoryBuffer(file_path, 10, clock_jump_threshold=60)
+    buffer.append(1000.0, 1.0)
+    buffer.append(1001.0, 2.0)
+
+    assert buffer.append(100.0, 3.0)
+    assert buffer.get_reset_count() == 1
+    assert buffer.get_range(float('-inf'), float('inf')) == [(100.0, 3.0)]
+    assert buffer.append(101.0, 4.0)
+    buffer.close()
+
+    # a file written while the clock was ahead is also cleared.
+    buffer = MqttHistoryBuffer(file_path, 10, clock_jump_threshold=60)
+    assert buffer.append(10.0, 5.0)
+    assert buffer.get_range(float('-inf'), float('inf')) == [(10.0, 5.0)]
+    buffer.close()
+
+
+def test_closed_buffer(file_path):
+    buffer = MqttHistoryBuffer(file_path, 10)
+    buffer.close()
+    buffer.close()
+
+    assert not buffer.append(1000.0, 1.0)
+    assert buffer.get_range(float('-inf'), float('inf')) == []
+
+
+def test_invalid_configuration(file_path):
+    with pytest.raises(ValueError):
+        MqttHistoryBuffer(file_path, 0)
+    with pytest.raises(ValueError):
+        MqttHistoryBuffer(file_path, 10, clock_jump_threshold=-1)
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from base_class_python.MqttMonitorThread import MqttMonitorThread
+from base_class_python.MonitorType import MonitorType
+from base_class_python.MqttHistoryBuffer import MqttHistoryBuffer
+import base_class_python.DateUtility as DateUtility
+
+from fake_hardware import CountingVariable
+from fake_mqtt import RecordingConnection, RecordingLogger
+
+
+def create_monitor_thread(history_buffer=None):
+    connection = RecordingConnection()
+    logger = RecordingLogger()
+    monitor_thread = MqttMonitorThread(CountingVariable("x"), connection, logger, history_buffer=history_buffer)
+    return (monitor_thread, connection, logger)
+
+
+def get_published_samples(connection):
+    samples = []
+    for (_, payload) in connection.messages:
+        (value, _, date) = payload.rpartition(';')
+        samples.append((value, DateUtility.date_string_to_timestamp(date)))
+    return samples
+
+
+def test_aggregate_reports_once_per_report_period():
+    (monitor_thread, connection, _) = create_monitor_thread()
+    monitor_thread.start_monitor(MonitorType.aggregate, 0.01, report_period=1.0, statistics=['count', 'mean'])
+    monitor_thread._last_report_time = start = 1000.0
+
+    for i in range(1, 251):
+        monitor_thread.process_measurement(float(i), start + i * 0.01)
+
+    summaries = [json.loads(value) for (value, _) in get_published_samples(connection)]
+    assert summaries == [{'count': 100, 'mean': 50.5}, {'count': 100, 'mean': 150.5}]
+    assert [timestamp - start for (_, timestamp) in get_published_samples(connection)] == pytest.approx([1.0, 2.0], abs=1e-5)
+
+
+def test_aggregate_after_overrun_restarts_the_report_period():
+    (monitor_thread, connection, _) = create_monitor_thread()
+    monitor_thread.start_monitor(MonitorType.aggregate, 0.1, report_period=1.0, statistics=['count'])
+    monitor_thread._last_report_time = start = 1000.0
+
+    monitor_thread.process_measurement(1.0, start + 5.0)
+    monitor_thread.process_measurement(1.0, start + 5.5)
+    monitor_thread.process_measurement(1.0, start + 6.0)
+
+    assert [json.loads(value) for (value, _) in get_published_samples(connection)] == [{'count': 1}, {'count': 2}]
+
+
+def test_non_numeric_values_are_counted_and_logged_once_per_report():
+    (monitor_thread, connection, logger) = create_monitor_thread()
+    monitor_thread.start_monitor(MonitorType.aggregate, 0.001, report_period=1.0, statistics=['count'])
+    monitor_thread._last_report_time = start = 1000.0
+
+    for i in range(1, 2001):
+        monitor_thread.process_measurement("on" if i % 2 == 0 else 1.0, start + i * 0.001)
+
+    assert [json.loads(value) for (value, _) in get_published_samples(connection)] == [{'count': 500, 'invalid': 500}, {'count': 500, 'invalid': 500}]
+    assert len(logger.logs) == 2
+    assert "500 non numeric values" in logger.logs[0]
+
+
+def test_periodic_and_change_modes():
+    (monitor_thread, connection, _) = create_monitor_thread()
+    monitor_thread.start_monitor(MonitorType.change, 0.1)
+    for (i, value) in enumerate([1, 1, 2, 2, 1]):
+        monitor_thread.process_measurement(value, 1000.0 + i)
+    assert [value for (value, _) in get_published_samples(connection)] == ["1", "2", "1"]
+
+    connection.messages.clear()
+    monitor_thread.start_monitor(MonitorType.periodic, 0.1)
+    for (i, value) in enumerate([1, 1, 2]):
+        monitor_thread.process_measurement(value, 1000.0 + i)
+    assert [value for (value, _) in get_published_samples(connection)] == ["1", "1", "2"]
+
+    monitor_thread.stop_monitor()
+    monitor_thread.process_measurement(3, 1010.0)
+    assert len(connection.messages) == 3
+
+
+def test_aggregate_configuration_errors():
+    (monitor_thread, _, _) = create_monitor_thread()
+
+    with pytest.raises(ValueError):
+        monitor_thread.start_monitor(MonitorType.aggregate, None, report_period=1.0)
+    with pytest.raises(ValueError):
+        monitor_thread.start_monitor(MonitorType.aggregate, 1.0, report_period=0.5)
+    with pytest.raises(ValueError):
+        monitor_thread.start_monitor(MonitorType.aggregate, 0.1, report_period=1.0, statistics=['median'])
+
+
+def test_history_discards_are_logged_once(tmp_path):
+    history_buffer = MqttHistoryBuffer(str(tmp_path / "x.hist"), 10, clock_jump_threshold=60)
+    (monitor_thread, _, logger) = create_monitor_thread(history_buffer)
+    monitor_thread.start_monitor(MonitorType.periodic, 0.1)
+
+    for timestamp in (1000.0, 990.0, 991.0, 992.0, 1001.0, 995.0, 10.0):
+        monitor_thread.process_measurement(1.0, timestamp)
+
+    assert history_buffer.get_range(float('-inf'), float('inf')) == [(10.0, 1.0)]
+    assert len(logger.logs) == 3
+    assert "discarded" in logger.logs[0] and "discarded" in logger.logs[1] and "cleared" in logger.logs[2]
+    history_buffer.close()
+
+
+def test_history_buffer_is_keyword_only():
+    with pytest.raises(TypeError):
+        MqttMonitorThread(CountingVariable("x"), RecordingConnection(), RecordingLogger(), "", None, None, None, (), None, None)
@@ -0,0 +1,112 @@
+import math
+
+import pytest
+
+from base_class_python.MqttHardwareServer import MqttHardwareServer
+import base_class_python.MqttResponseCodec as MqttResponseCodec
+
+from fake_hardware import CountingVariable
+from fake_mqtt import publish_command
+
+
+VALUES = [1, -2**63, 2.5, "text; with [separators], 'quotes'", True, False, None, [1, [2.0, "a"]], ""]
+
+
+@pytest.mark.parametrize("codec_name", ["json", "binary"])
+def test_typed_codecs_round_trip(codec_name):
+    codec = MqttResponseCodec.get_codec(codec_name)
+
+    for response_code in ("DONE", "ERROR"):
+        payload = codec.encode_response(response_code, "2023-01-01T00:00:00.000000", VALUES)
+        assert MqttResponseCodec.decode_response(payload if type(payload) == bytes else payload.encode()) == (response_code, "2023-01-01T00:00:00.000000", VALUES)
+
+    payload = codec.encode_nack("id", "message", "commands/x", "GET;id")
+    assert MqttResponseCodec.decode_response(payload if type(payload) == bytes else payload.encode()) == ("NACK", "id", ["message", "commands/x", "GET;id"])
+
+
+def test_binary_codec_keeps_bytes_and_special_floats():
+    codec = MqttResponseCodec.get_codec("binary")
+
+    (_, _, values) = codec.decode_response(codec.encode_response("DONE", "id", [b'\x00\xff', math.inf, 2**64]))
+
+    assert values == [b'\x00\xff', math.inf, str(2**64)]
+
+
+def test_binary_codec_wire_format():
+    codec = MqttResponseCodec.get_codec("binary")
+
+    payload = codec.encode_response("ERROR", "ab", [1, "c"])
+
+    assert payload == (b'\xb1\x01\x01' + b'\x02\x00\x00\x00' + b'ab'
+                       + b'l\x02\x00\x00\x00'
+                       + b'i\x01\x00\x00\x00\x00\x00\x00\x00'
+                       + b's\x01\x00\x00\x00c')
+
+
+def test_binary_codec_accepts_ids_of_the_longest_correlation_data():
+    codec = MqttResponseCodec.get_codec("binary")
+    command_id = (b'\xff' * 65535).hex()
+
+    assert codec.decode_response(codec.encode_response("DONE", command_id, [1])) == ("DONE", command_id, [1])
+
+
+def test_binary_codec_rejects_truncated_payloads():
+    codec = MqttResponseCodec.get_codec("binary")
+    payload = codec.encode_response("DONE", "id", ["value"])
+
+    for length in (1, 5, len(payload) - 1):
+        with pytest.raises(ValueError):
+            codec.decode_response(payload[:length])
+
+
+def test_text_codec_keeps_the_original_format():
+    codec = MqttResponseCodec.get_codec("text")
+
+    assert codec is MqttResponseCodec.default_codec
+    assert codec.encode_response("DONE", "id", []) == "DONE;id"
+    assert codec.encode_response("DONE", "id", [1, 'a']) == "DONE;id;[1, 'a']"
+    assert codec.encode_response("ERROR", "id", ["message"]) == "ERROR;id;['message']"
+    assert codec.encode_nack("id", "message", "commands/x", "GET;id") == "NACK_commands/x_GET;id_message"
+
+
+def test_text_codec_decodes_old_responses():
+    assert MqttResponseCodec.decode_response(b"DONE;id") == ("DONE", "id", [])
+    assert MqttResponseCodec.decode_response(b"DONE;id;[1, 'a;b']") == ("DONE", "id", [1, 'a;b'])
+    # values of old servers that aren't python literals are given as strings.
+    assert MqttResponseCodec.decode_response(b"DONE;id;[on, 3]") == ("DONE", "id", ["on", "3"])
+    assert MqttResponseCodec.decode_response(b"NACK_commands/x_GET_message") == ("NACK", None, ["NACK_commands/x_GET_message"])
+
+    with pytest.raises(ValueError):
+        MqttResponseCodec.decode_response(b"WRONG;id")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        MqttResponseCodec.get_codec("xml")
+
+
+def test_binary_response_with_long_correlation_data(broker, servers):
+    servers.append(MqttHardwareServer("server", [CountingVariable("temperature", 21.5)], "broker", mqtt_v5=True))
+    correlation_data = b'\x01' * 40000
+
+    publish_command(broker, "commands/temperature", "GET;;[];binary", response_topic="clients/test", correlation_data=correlation_data)
+
+    responses = broker.get_published("clients/test")
+    assert MqttResponseCodec.decode_response(responses[0].payload) == ("DONE", correlation_data.hex(), [21.5])
+
+
+class FailingCodec(MqttResponseCodec.BinaryResponseCodec):
+    def encode_response(self, response_code, command_id, response_list):
+        raise ValueError("can't encode")
+
+
+def test_encoding_failure_is_answered_with_error(broker, servers):
+    server = MqttHardwareServer("server", [], "broker")
+    servers.append(server)
+
+    server._connection.send_response("responses/x", "DONE", "id", [1], "commands/x", "GET;id", FailingCodec())
+
+    responses = broker.get_published("responses/x")
+    (response_code, command_id, response_list) = MqttResponseCodec.decode_response(responses[0].payload)
+    assert (response_code, command_id) == ("ERROR", "id")
+    assert "can't encode" in response_list[0]
@@ -0,0 +1,141 @@
+import threading
+import time
+
+from base_class_python.MqttConnection import MqttConnection
+from base_class_python.MqttSpool import MqttSpool
+
+from fake_mqtt import RecordingLogger
+
+
+class RecordingPublisher:
+    """
+    A publish function that records the messages, slowly enough for the replay to be interrupted.
+    """
+
+    def __init__(self, delay: float=0.001) -> None:
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.messages: list[tuple[str, bytes]] = []
+
+    def __call__(self, topic: str, payload: bytes) -> bool:
+        time.sleep(self._delay)
+        with self._lock:
+            self.messages.append((topic, payload))
+        return True
+
+
+def wait_for_replay(spool: MqttSpool, timeout: float=5) -> None:
+    t0 = time.time()
+    while spool.has_messages() and time.time() - t0 < timeout:
+        time.sleep(0.01)
+
+
+def test_replay_sends_all_messages_in_order(tmp_path):
+    spool = MqttSpool(str(tmp_path), segment_size=256, replay_rate=100000, replay_batch_size=10)
+    for i in range(40):
+        spool.append("data/x", "{}".format(i))
+
+    publisher = RecordingPublisher(delay=0)
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+
+    assert [payload for (_, payload) in publisher.messages] == [str(i).encode() for i in range(40)]
+    assert spool.get_statistics()["ReplayedMessages"] == 40
+    spool.close()
+
+
+def test_replay_restarted_immediately_after_stop(tmp_path):
+    spool = MqttSpool(str(tmp_path), replay_rate=100000, replay_batch_size=10)
+    for i in range(40):
+        spool.append("data/x", "{}".format(i))
+
+    publisher = RecordingPublisher()
+    spool.start_replay(publisher)
+    spool.stop_replay()
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+
+    assert sorted(set(int(payload) for (_, payload) in publisher.messages)) == list(range(40))
+    assert spool.get_statistics()["ReplayedMessages"] == len(publisher.messages)
+    spool.close()
+
+
+def test_interrupted_replay_resumes_from_last_message(tmp_path):
+    spool = MqttSpool(str(tmp_path), replay_rate=100000, replay_batch_size=10)
+    for i in range(40):
+        spool.append("data/x", "{}".format(i))
+
+    sent = []
+    spool.start_replay(lambda topic, payload: len(sent) < 15 and sent.append(payload) is None)
+    wait_for_replay(spool, timeout=0.5)
+
+    publisher = RecordingPublisher(delay=0)
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+
+    assert sent + [payload for (_, payload) in publisher.messages] == [str(i).encode() for i in range(40)]
+    spool.close()
+
+
+def test_messages_appended_during_replay_are_replayed(tmp_path):
+    spool = MqttSpool(str(tmp_path), replay_rate=100000, replay_batch_size=10)
+    for i in range(20):
+        spool.append("data/x", "{}".format(i))
+
+    publisher = RecordingPublisher(delay=0.005)
+    spool.start_replay(publisher)
+    # as a monitor thread that checked the connection just before it was recovered.
+    spool.append("data/x", "20")
+    wait_for_replay(spool)
+
+    assert [payload for (_, payload) in publisher.messages] == [str(i).encode() for i in range(21)]
+    spool.close()
+
+
+def test_messages_appended_after_replay_are_replayed_by_a_new_replay(tmp_path):
+    spool = MqttSpool(str(tmp_path), replay_rate=100000, replay_batch_size=10)
+    spool.append("data/x", "0")
+    publisher = RecordingPublisher(delay=0)
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+
+    spool.append("data/x", "1")
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+
+    assert [payload for (_, payload) in publisher.messages] == [b"0", b"1"]
+    spool.close()
+
+
+def test_messages_appended_after_close_are_kept_for_the_next_execution(tmp_path):
+    spool = MqttSpool(str(tmp_path))
+    spool.append("data/x", "0")
+    spool.close()
+    spool.append("data/x", "1")
+
+    assert spool._write_file is None
+
+    spool = MqttSpool(str(tmp_path), replay_rate=100000)
+    publisher = RecordingPublisher(delay=0)
+    spool.start_replay(publisher)
+    wait_for_replay(spool)
+    assert [payload for (_, payload) in publisher.messages] == [b"0", b"1"]
+    spool.close()
+
+
+def test_connection_replays_messages_spooled_while_reconnecting(broker, tmp_path):
+    spool = MqttSpool(str(tmp_path), replay_rate=100000)
+    connection = MqttConnection(lambda *args: None, lambda *args: None, lambda: None, RecordingLogger(), "connection", "broker", spool=spool)
+    connection._connected = False
+    spool_append = spool.append
+
+    def append_while_reconnecting(topic, payload, retain=False):
+        spool_append(topic, payload, retain)
+        connection._connected = True
+
+    spool.append = append_while_reconnecting
+    connection.send_single_mqtt_message("data/x", "1", spool_when_disconnected=True)
+    wait_for_replay(spool)
+
+    assert [message.payload for message in broker.get_published("data/x")] == [b"1"]
+    connection.close_connection()
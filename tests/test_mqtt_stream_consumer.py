@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from base_class_python.MqttStreamConsumer import MqttStreamConsumer
+import base_class_python.DateUtility as DateUtility
+
+
+def publish_samples(broker, variable_name, values):
+    for value in values:
+        broker.publish("data/{}".format(variable_name), "{};{}".format(value, DateUtility.get_date_string()), None)
+
+
+def test_batches_are_given_when_full_or_delayed(broker):
+    consumer = MqttStreamConsumer("broker", ["x"], batch_size=10, max_batch_delay=0.05)
+    batches = []
+    for values in (range(0, 10), range(10, 20), range(20, 25)):
+        publish_samples(broker, "x", values)
+        batches.append(consumer.get_next_batch(timeout=1))
+
+    assert [list(batch.values) for batch in batches] == [list(range(0, 10)), list(range(10, 20)), list(range(20, 25))]
+    assert all(len(batch.timestamps) == len(batch) for batch in batches)
+    assert consumer.get_next_batch(timeout=0.1) is None
+    consumer.close()
+
+
+def test_invalid_samples_are_counted(broker):
+    consumer = MqttStreamConsumer("broker", ["x"])
+    broker.publish("data/x", "not a number;{}".format(DateUtility.get_date_string()), None)
+    broker.publish("data/x", "1.0;not a date", None)
+
+    assert consumer.get_statistics()["Invalid"] == 2
+    consumer.close()
+
+
+def test_full_buffer_wait_is_bounded(broker):
+    consumer = MqttStreamConsumer("broker", ["x"], batch_size=10, max_buffered_samples=10, max_full_wait=0.1)
+
+    t0 = time.monotonic()
+    publish_samples(broker, "x", range(15))
+    elapsed = time.monotonic() - t0
+
+    # only the first sample that finds the buffer full waits, the next ones are dropped directly.
+    assert elapsed < 0.5
+    statistics = consumer.get_statistics()
+    assert (statistics["Received"], statistics["Dropped"], statistics["Buffered"]) == (15, 5, 10)
+
+    assert list(consumer.get_next_batch(timeout=1).values) == list(range(10))
+    publish_samples(broker, "x", [100])
+    assert consumer.get_statistics()["Buffered"] == 1
+    consumer.close()
+
+
+def test_full_buffer_wait_ends_when_a_batch_is_consumed(broker):
+    consumer = MqttStreamConsumer("broker", ["x"], batch_size=10, max_buffered_samples=10, max_full_wait=5)
+    publish_samples(broker, "x", range(10))
+
+    consumer_thread = threading.Thread(target=lambda: (time.sleep(0.1), consumer.get_next_batch(timeout=1)))
+    consumer_thread.start()
+    publish_samples(broker, "x", [10])
+    consumer_thread.join()
+
+    statistics = consumer.get_statistics()
+    assert (statistics["Dropped"], statistics["Buffered"]) == (0, 1)
+    consumer.close()
+
+
+def test_drop_when_full(broker):
+    consumer = MqttStreamConsumer("broker", ["x"], batch_size=10, max_buffered_samples=10, drop_when_full=True)
+    publish_samples(broker, "x", range(12))
+
+    assert consumer.get_statistics()["Dropped"] == 2
+    consumer.close()
+
+
+def test_invalid_full_wait(broker):
+    with pytest.raises(ValueError):
+        MqttStreamConsumer("broker", ["x"], max_full_wait=60)
+
+
+def test_async_iteration_ends_after_close(broker):
+    consumer = MqttStreamConsumer("broker", ["x"], batch_size=5, max_batch_delay=0.05)
+
+    async def consume():
+        batches = []
+        async for batch in consumer:
+            batches.append(list(batch.values))
+        return batches
+
+    def produce():
+        publish_samples(broker, "x", range(5))
+        time.sleep(0.1)
+        publish_samples(broker, "x", range(5, 7))
+        time.sleep(consumer._ASYNC_WAIT_PERIOD * 2)
+        consumer.close()
+
+    producer_thread = threading.Thread(target=produce)
+    producer_thread.start()
+    batches = asyncio.run(consume())
+    producer_thread.join()
+
+    assert batches == [list(range(5)), [5, 6]]
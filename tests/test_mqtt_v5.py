@@ -0,0 +1,143 @@
+import pytest
+
+from base_class_python.MqttHardwareServer import MqttHardwareServer
+from base_class_python.MqttParser import MqttParser
+from base_class_python.MqttValueManager import MqttValueManager
+import base_class_python.DateUtility as DateUtility
+import base_class_python.MqttResponseCodec as MqttResponseCodec
+
+from fake_hardware import CountingVariable
+from fake_mqtt import publish_command
+
+
+def create_server(servers, name, variable, **kwargs):
+    server = MqttHardwareServer(name, [variable], "broker", mqtt_v5=True, **kwargs)
+    servers.append(server)
+    return server
+
+
+def test_parser_accepts_empty_id_only_when_not_required():
+    parser = MqttParser()
+
+    (command_name, command_type, command_id, parameters, codec) = parser.parse_mqtt_command("commands/temperature", "GET", command_id_required=False)
+    assert (command_name, command_type, command_id, parameters) == ("temperature", "GET", "", [])
+    assert codec is MqttResponseCodec.default_codec
+
+    (_, _, command_id, parameters, codec) = parser.parse_mqtt_command("commands/temperature", "PUT;;[3]", command_id_required=False)
+    assert (command_id, parameters) == ("", [3])
+
+    (_, _, _, _, codec) = parser.parse_mqtt_command("commands/temperature", "GET;;[];json", command_id_required=False)
+    assert codec.name == "json"
+
+    with pytest.raises(ValueError):
+        parser.parse_mqtt_command("commands/temperature", "GET")
+    with pytest.raises(ValueError):
+        parser.parse_mqtt_command("commands/temperature", "GET;;[]")
+
+
+def test_parser_read_topic():
+    parser = MqttParser(topic_origin="lab/")
+
+    assert parser.is_read_topic("lab/commands/temperature/read")
+    assert not parser.is_read_topic("lab/commands/temperature")
+    assert not parser.is_read_topic("lab/commands/read")
+    assert parser.parse_mqtt_command("lab/commands/temperature/read", "GET", command_id_required=False)[0] == "temperature"
+
+
+def test_server_answers_in_response_topic_with_correlation_data(broker, servers):
+    create_server(servers, "server", CountingVariable("temperature", 21.5))
+
+    publish_command(broker, "commands/temperature", "GET", response_topic="clients/test", correlation_data=b'\x01\x02')
+
+    responses = broker.get_published("clients/test")
+    assert len(responses) == 1
+    assert responses[0].properties.CorrelationData == b'\x01\x02'
+    assert MqttResponseCodec.decode_response(responses[0].payload) == ("DONE", "0102", [21.5])
+    assert broker.get_published("responses/temperature") == []
+
+
+def test_server_nacks_with_correlation_data(broker, servers):
+    create_server(servers, "server", CountingVariable("temperature", 21.5))
+
+    publish_command(broker, "commands/temperature", "GET;;[", response_topic="clients/test", correlation_data=b'id')
+
+    responses = broker.get_published("clients/test")
+    assert len(responses) == 1
+    assert responses[0].properties.CorrelationData == b'id'
+    assert MqttResponseCodec.decode_response(responses[0].payload)[0] == "NACK"
+
+
+def test_value_manager_round_trip(broker, servers):
+    create_server(servers, "server", CountingVariable("temperature", 21.5))
+    value_manager = MqttValueManager("broker", mqtt_v5=True)
+
+    assert value_manager.get_variable_value("temperature") == ("DONE", [21.5])
+    assert value_manager.get_variable_value("temperature", response_codec="json") == ("DONE", [21.5])
+
+    requests = broker.get_published("commands/temperature")
+    responses = broker.get_published(value_manager._response_topic)
+    assert len(requests) == 2 and len(responses) == 2
+    for (request, response) in zip(requests, responses):
+        assert request.properties.ResponseTopic == value_manager._response_topic
+        assert response.properties.CorrelationData == request.properties.CorrelationData
+
+
+def test_value_manager_ignores_other_correlation_data(broker, servers):
+    create_server(servers, "server", CountingVariable("temperature", 21.5))
+    value_manager = MqttValueManager("broker", mqtt_v5=True)
+
+    publish_command(broker, "commands/temperature", "GET", response_topic=value_manager._response_topic, correlation_data=b'other')
+
+    assert value_manager._received is False
+    with pytest.raises(TimeoutError):
+        value_manager._get_variable_value_v5("missing", 0.1, "text")
+
+
+def test_shared_reads_are_dispatched_once_in_the_group(broker, servers):
+    owner_variable = CountingVariable("temperature", 21.5)
+    replica_variable = CountingVariable("temperature", 21.5)
+    create_server(servers, "owner", owner_variable, shared_subscription_group="group")
+    create_server(servers, "replica", replica_variable, shared_subscription_group="group", read_only_replica=True)
+    value_manager = MqttValueManager("broker", mqtt_v5=True, shared_reads=True)
+
+    for _ in range(10):
+        assert value_manager.get_variable_value("temperature") == ("DONE", [21.5])
+
+    assert owner_variable.get_commands + replica_variable.get_commands == 10
+    assert owner_variable.get_commands > 0 and replica_variable.get_commands > 0
+    assert len(broker.get_published(value_manager._response_topic)) == 10
+
+
+def test_commands_topic_only_reaches_the_owner(broker, servers):
+    owner_variable = CountingVariable("temperature", 21.5)
+    replica_variable = CountingVariable("temperature", 21.5)
+    create_server(servers, "owner", owner_variable, shared_subscription_group="group")
+    create_server(servers, "replica", replica_variable, shared_subscription_group="group", read_only_replica=True)
+
+    publish_command(broker, "commands/temperature", "PUT;{};[3]".format(DateUtility.get_date_string()))
+    publish_command(broker, "commands/temperature", "GET;{}".format(DateUtility.get_date_string()))
+
+    assert (owner_variable.put_commands, owner_variable.get_commands) == (1, 1)
+    assert (replica_variable.put_commands, replica_variable.get_commands) == (0, 0)
+    assert [MqttResponseCodec.decode_response(response.payload)[0] for response in broker.get_published("responses/temperature")] == ["DONE", "DONE"]
+
+
+def test_read_topic_rejects_writes(broker, servers):
+    owner_variable = CountingVariable("temperature", 21.5)
+    create_server(servers, "owner", owner_variable, shared_subscription_group="group")
+
+    publish_command(broker, "commands/temperature/read", "PUT;{};[3]".format(DateUtility.get_date_string()))
+
+    assert owner_variable.put_commands == 0
+    responses = broker.get_published("responses/temperature")
+    assert len(responses) == 1
+    assert MqttResponseCodec.decode_response(responses[0].payload)[0] == "ERROR"
+
+
+def test_shared_group_configuration_errors(broker):
+    with pytest.raises(ValueError):
+        MqttHardwareServer("server", [], "broker", shared_subscription_group="group")
+    with pytest.raises(ValueError):
+        MqttHardwareServer("server", [], "broker", mqtt_v5=True, read_only_replica=True)
+    with pytest.raises(ValueError):
+        MqttValueManager("broker", shared_reads=True)
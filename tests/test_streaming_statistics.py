@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from base_class_python.StreamingStatistics import StreamingStatistics
+
+
+def test_summary_of_values():
+    statistics = StreamingStatistics(list(StreamingStatistics.supported_statistics))
+    values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+    for value in values:
+        statistics.add(value)
+
+    summary = statistics.get_summary()
+
+    mean = sum(values) / len(values)
+    assert summary['count'] == len(values)
+    assert (summary['min'], summary['max'], summary['first'], summary['last']) == (1.0, 9.0, 3.0, 6.0)
+    assert summary['mean'] == pytest.approx(mean)
+    assert summary['std'] == pytest.approx(math.sqrt(sum((value - mean) ** 2 for value in values) / len(values)))
+
+
+def test_std_is_stable_with_large_offsets():
+    statistics = StreamingStatistics(['std'])
+    for value in (1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16):
+        statistics.add(value)
+
+    assert statistics.get_summary()['std'] == pytest.approx(math.sqrt(22.5))
+
+
+def test_default_and_empty_summary():
+    statistics = StreamingStatistics()
+
+    assert statistics.get_statistics() == list(StreamingStatistics.default_statistics)
+    assert statistics.get_summary() == {'min': None, 'max': None, 'mean': None, 'count': 0}
+
+
+def test_reset_and_invalid_count():
+    statistics = StreamingStatistics(['count'])
+    statistics.add(1.0)
+    statistics.add_invalid()
+    statistics.add_invalid()
+
+    assert statistics.get_summary() == {'count': 1, 'invalid': 2}
+
+    statistics.reset()
+    assert statistics.get_summary() == {'count': 0}
+    assert statistics.get_invalid_count() == 0
+
+
+def test_unsupported_statistics():
+    with pytest.raises(ValueError):
+        StreamingStatistics(['median'])
+    with pytest.raises(ValueError):
+        StreamingStatistics([])